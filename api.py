@@ -0,0 +1,231 @@
+"""
+api.py
+
+Read-only JSON API on the dashboard's Flask server, for tools that want the
+cutoff history without driving the Dash UI.
+
+    GET /api/series?component=Active&mos=11B&rank=SGT&start=Aug-2023&end=Dec-2025
+    GET /api/forecast?component=Active&mos=11B&rank=SGT&ci=95
+    GET /api/probability?component=Active&mos=11B&rank=SGT&points=450
+    GET /api/snapshot?component=Active&mos=11B&rank=SGT
+    GET /api/versions
+
+component, mos and rank are required; start/end are optional month bounds
+("Aug-2023" like the dashboard dropdowns, or "2023-08"). as_of=<dataset
+version> answers from an earlier recorded release instead of the current
+one (/api/versions lists them). Responses carry an
+ETag derived from the dataset version and the query, so clients and CDNs can
+cache them until the next data release.
+"""
+
+import hashlib
+
+import pandas as pd
+from flask import Blueprint, jsonify, request, send_file
+
+from data_loader import (
+    get_dataset_version,
+    is_historical_version,
+    is_known_version,
+    list_versions,
+    rank_columns,
+    select_series,
+)
+from server_tuning import make_conditional
+from dashboard_scripts.bayesian_adjustment import compute_bayesian_promotion_probability
+from dashboard_scripts.calculate_historical_probability import calculate_historical_probability
+from dashboard_scripts.calculate_promotion_percentage import calculate_promotion_percentage
+from dashboard_scripts.predict_next_promotion import predict_next_promotion_points
+from dashboard_scripts.snapshots import snapshot_path
+
+API_CACHE_MAX_AGE = 3600
+VALID_COMPONENTS = ("ACTIVE", "RESERVE")
+VALID_RANKS = ("SGT", "SSG")
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api.errorhandler(ApiError)
+def _handle_api_error(error):
+    return jsonify({"error": error.message}), error.status
+
+
+def _parse_month(value, name):
+    if not value:
+        return None
+    for fmt in ("%b-%Y", "%Y-%m"):
+        try:
+            return pd.to_datetime(value, format=fmt)
+        except ValueError:
+            continue
+    raise ApiError(f"Invalid {name} '{value}', expected e.g. Aug-2023 or 2023-08")
+
+
+def _series_params():
+    args = request.args
+    component = args.get("component", "").upper()
+    mos = args.get("mos", "").upper()
+    rank = args.get("rank", "").upper()
+
+    if component not in VALID_COMPONENTS:
+        raise ApiError(f"component must be one of {', '.join(VALID_COMPONENTS)}")
+    if not mos:
+        raise ApiError("mos is required")
+    if rank not in VALID_RANKS:
+        raise ApiError(f"rank must be one of {', '.join(VALID_RANKS)}")
+
+    start = _parse_month(args.get("start"), "start")
+    end = _parse_month(args.get("end"), "end")
+    as_of = _as_of()
+    try:
+        series = select_series(component, mos, start, end, as_of)
+    except ValueError:
+        # A recorded release whose stored copy is damaged or missing.
+        raise ApiError(f"Dataset version {as_of} could not be read from the version store", status=500) from None
+    if series.empty:
+        raise ApiError(f"No data for {component} {mos} in the requested range", status=404)
+    return component, mos, rank, series
+
+
+def _as_of():
+    as_of = request.args.get("as_of") or None
+    if as_of is not None and is_historical_version(as_of) and not is_known_version(as_of):
+        raise ApiError(f"Unknown dataset version {as_of}", status=404)
+    return as_of
+
+
+def _response_version():
+    """The dataset version a response was computed from."""
+    return _as_of() or get_dataset_version()
+
+
+def _int_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"{name} must be an integer")
+
+
+def _none_if_nan(value):
+    return None if pd.isna(value) else value
+
+
+@api.after_request
+def _add_cache_headers(response):
+    if response.status_code != 200:
+        return response
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    etag = hashlib.sha256(f"{get_dataset_version()}|{request.path}?{query}".encode()).hexdigest()[:32]
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = API_CACHE_MAX_AGE
+    response.headers["X-Dataset-Version"] = _response_version()
+    return make_conditional(response)
+
+
+@api.route("/series")
+def series():
+    component, mos, rank, df = _series_params()
+    cutoff_col, eligibles_col, promotions_col = rank_columns(rank)
+    points = [
+        {
+            "date": date.strftime("%Y-%m"),
+            "cutoff": _none_if_nan(cutoff),
+            "eligibles": _none_if_nan(eligibles),
+            "promotions": _none_if_nan(promotions),
+        }
+        for date, cutoff, eligibles, promotions in zip(
+            df["Date"], df[cutoff_col], df[eligibles_col], df[promotions_col]
+        )
+    ]
+    return jsonify(
+        {
+            "component": component,
+            "mos": mos,
+            "rank": rank,
+            "dataset_version": _response_version(),
+            "points": points,
+        }
+    )
+
+
+@api.route("/forecast")
+def forecast():
+    component, mos, rank, df = _series_params()
+    ci_level = _int_arg("ci", 95)
+    if not 50 <= ci_level <= 99:
+        raise ApiError("ci must be between 50 and 99")
+
+    cutoff_col, _, _ = rank_columns(rank)
+    predicted, interval = predict_next_promotion_points(df, cutoff_col, ci_level=ci_level)
+    if predicted is None:
+        raise ApiError("At least 3 months of data are needed for a forecast", status=404)
+
+    return jsonify(
+        {
+            "component": component,
+            "mos": mos,
+            "rank": rank,
+            "dataset_version": _response_version(),
+            "next_month": (df["Date"].max() + pd.DateOffset(months=1)).strftime("%Y-%m"),
+            "predicted_cutoff": int(predicted),
+            "ci_level": ci_level,
+            "ci_lower": int(interval[0]),
+            "ci_upper": int(interval[1]),
+        }
+    )
+
+
+@api.route("/probability")
+def probability():
+    component, mos, rank, df = _series_params()
+    points = _int_arg("points")
+    if points is None:
+        raise ApiError("points is required")
+
+    cutoff_col, eligibles_col, promotions_col = rank_columns(rank)
+    return jsonify(
+        {
+            "component": component,
+            "mos": mos,
+            "rank": rank,
+            "points": points,
+            "dataset_version": _response_version(),
+            "months": len(df),
+            "historical_probability": float(calculate_historical_probability(df, cutoff_col, points)),
+            "evidence_weighted_probability": float(
+                compute_bayesian_promotion_probability(df, cutoff_col, points)
+            ),
+            "percent_promoted": float(calculate_promotion_percentage(df, promotions_col, eligibles_col)),
+        }
+    )
+
+
+@api.route("/snapshot")
+def snapshot():
+    component, mos, rank, _ = _series_params()
+    if is_historical_version(_as_of()):
+        raise ApiError("Snapshots are only kept for the current release", status=404)
+    path = snapshot_path(component, mos, rank)
+    if not path.exists():
+        raise ApiError(f"No snapshot for {component} {mos} {rank}", status=404)
+    return send_file(path, mimetype="application/json", conditional=False, etag=False)
+
+
+@api.route("/versions")
+def versions():
+    return jsonify({"current": get_dataset_version(), "versions": list_versions()})
+
+
+def register_api(server):
+    server.register_blueprint(api)
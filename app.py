@@ -1,5 +1,7 @@
 # test.py
 import dash
+import os
+from functools import lru_cache
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 import pandas as pd
@@ -8,13 +10,30 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
-from data_loader import load_master_df, get_sorted_dates
+from data_loader import (
+    RELOAD_CHECK_SECONDS,
+    count_rows,
+    get_available_dates,
+    get_dataset_version,
+    get_mos_list,
+    get_series_length,
+    list_versions,
+    rank_columns,
+    select_rows,
+    select_series,
+)
 
 from dashboard_scripts.update_change_graph import create_change_graph
 from dashboard_scripts.bayesian_adjustment import compute_bayesian_promotion_probability
 from dashboard_scripts.predict_next_promotion import predict_next_promotion_points
 from dashboard_scripts.calculate_promotion_percentage import calculate_promotion_percentage
+from dashboard_scripts.calculate_historical_probability import calculate_historical_probability
+from dashboard_scripts.series_figures import create_competitiveness_graph, create_promotion_graph, create_streamgraph
+from dashboard_scripts.snapshots import load_snapshot
 from dash import callback_context
+from server_tuning import init_compression
+from api import register_api
+from result_cache import CacheWarmer, FilterPopularity, ResultCache, Speculator
 
 
 # ── Initialize Dash with Pages turned on ───────────────────────
@@ -29,11 +48,15 @@ app = dash.Dash(
 )
 
 server = app.server
+init_compression(server)
+register_api(server)
 app.title = "Army Promotion Point Dashboard"
 
 # ── Load your master CSV and Coming Soon text ──────────────────
-df = load_master_df()
-sorted_dates = get_sorted_dates(df)
+sorted_dates = get_available_dates()
+# A sidebar for a partial selection (e.g. a component but no MOS yet) shows
+# at most this many of the latest rows; the full history is tens of thousands.
+SIDEBAR_MAX_ROWS = 1000
 
 coming_soon_url = (
     "https://raw.githubusercontent.com/DanMacCode/"
@@ -202,11 +225,12 @@ app.layout = html.Div(
         Output("trendline-checkbox", "value"),
         Output("volatility-checkbox", "value"),
         Output("toggle-probability", "value"),
+        Output("as-of-dropdown", "value"),
     ],
     Input("clear-button", "n_clicks")
 )
 def clear_inputs(n_clicks):
-    return None, None, None, None, None, None, [], [], ["show"]
+    return None, None, None, None, None, None, [], [], ["show"], None
 
 
 # 2) Main callback: update all graphs, gauges, text, etc.
@@ -238,6 +262,7 @@ def clear_inputs(n_clicks):
         State("component-dropdown", "value"),
         State("rank-dropdown", "value"),
         State("mos-dropdown", "value"),
+        State("as-of-dropdown", "value"),
     ],
     prevent_initial_call=True,
 )
@@ -253,10 +278,10 @@ def update_graphs(
     component,
     rank,
     mos,
+    as_of=None,
 ):
-    # copied exactly from your working version...
-    empty_fig = px.line(title="No Data Available")
     if not n_clicks or not start_month or not end_month or not rank or not mos or not component:
+        empty_fig = px.line(title="No Data Available")
         return (
             empty_fig,
             empty_fig,
@@ -271,20 +296,60 @@ def update_graphs(
             "",
         )
 
-    filtered_df = df.copy()
-    filtered_df["Date"] = pd.to_datetime(filtered_df["Date"], format="%Y-%b", errors="coerce")
-    filtered_df = (
-        filtered_df[
-            (filtered_df["Date"] >= pd.to_datetime(start_month, format="%b-%Y"))
-            & (filtered_df["Date"] <= pd.to_datetime(end_month, format="%b-%Y"))
-        ]
-        .sort_values(by="Date")
+    if as_of is None:
+        filter_popularity.record((component, mos, rank, start_month, end_month))
+    key = graphs_key(ci_level, user_points, trendline, volatility, toggle_probability, start_month, end_month, component, rank, mos)
+    version = as_of or get_dataset_version()
+    result = graph_cache.get(version, key) or speculator.claim(version, key)
+    if result is None:
+        result = render_graphs(*key, as_of=as_of)
+        graph_cache.put(version, key, result)
+    return result
+
+
+def graphs_key(ci_level, user_points, trendline, volatility, toggle_probability, start_month, end_month, component, rank, mos):
+    """The update_graphs inputs as a hashable, JSON-friendly cache key (argument order of render_graphs)."""
+    return (
+        ci_level,
+        user_points,
+        tuple(sorted(trendline or [])),
+        tuple(sorted(volatility or [])),
+        tuple(sorted(toggle_probability or [])),
+        start_month,
+        end_month,
+        component,
+        rank,
+        mos,
     )
 
-    if component:
-        filtered_df = filtered_df[filtered_df["Component"].str.upper() == component.upper()]
-    if mos:
-        filtered_df = filtered_df[filtered_df["MOS"] == mos]
+
+def default_graphs_key(component, mos, rank, start_month, end_month):
+    """graphs_key for a filter selection with the layout's default points, confidence level and overlays."""
+    return graphs_key(95, None, [], [], ["show"], start_month, end_month, component, rank, mos)
+
+
+def render_graphs(
+    ci_level,
+    user_points,
+    trendline,
+    volatility,
+    toggle_probability,
+    start_month,
+    end_month,
+    component,
+    rank,
+    mos,
+    as_of=None,
+):
+    # copied exactly from your working version...
+    empty_fig = px.line(title="No Data Available")
+    filtered_df = select_series(
+        component,
+        mos,
+        pd.to_datetime(start_month, format="%b-%Y"),
+        pd.to_datetime(end_month, format="%b-%Y"),
+        as_of=as_of,
+    )
     if filtered_df.empty:
         return (
             empty_fig,
@@ -300,136 +365,41 @@ def update_graphs(
             "",
         )
 
-    promotion_column = "Cutoff_SGT" if rank == "SGT" else "Cutoff_SSG"
-    promotions_col = "Promotions_SGT" if rank == "SGT" else "Promotions_SSG"
-    eligibles_col = "Eligibles_SGT" if rank == "SGT" else "Eligibles_SSG"
+    promotion_column, eligibles_col, promotions_col = rank_columns(rank)
 
     # Predicted cutoff
     y_pred, (ci_lower, ci_upper) = predict_next_promotion_points(
         filtered_df, promotion_column, ci_level=ci_level
     )
     # Historical probability
-    historical_probability = (
-        sum(score <= user_points for score in filtered_df[promotion_column]) / len(filtered_df) * 100
-        if user_points is not None
-        else 0
-    )
+    historical_probability = calculate_historical_probability(filtered_df, promotion_column, user_points)
     # Bayesian adjusted
     adjusted_probability = compute_bayesian_promotion_probability(
         filtered_df, promotion_column, user_points
     )
 
     # Promotion Points Over Time
-    fig1 = px.line(
+    fig1 = create_promotion_graph(
         filtered_df,
-        x="Date",
-        y=promotion_column,
-        title="Promotion Points Over Time",
-        markers=True,
-        color_discrete_sequence=["green"],
-        labels={promotion_column: "MOS Cutoffs"},
-    )
-    fig1.update_traces(name="MOS Cutoff Points", showlegend=True)
-
-    if "trend" in trendline:
-        x_vals = np.arange(len(filtered_df))
-        y_vals = filtered_df[promotion_column].dropna()
-        if len(y_vals) > 1:
-            poly = np.polyfit(x_vals, y_vals, 1)
-            line = np.poly1d(poly)(x_vals)
-            fig1.add_scatter(x=filtered_df["Date"], y=line, mode="lines",
-                             line=dict(color="gold", dash="solid"), name="Trend Line")
-
-    if "volatility" in volatility:
-        filtered_df["SE"] = filtered_df[promotion_column].rolling(3, min_periods=1).std()
-        upper = (filtered_df[promotion_column] + filtered_df["SE"]).clip(upper=798)
-        lower = (filtered_df[promotion_column] - 0.5 * filtered_df["SE"]).clip(lower=0)
-        fig1.add_traces(
-            go.Scatter(
-                x=list(filtered_df["Date"]) + list(filtered_df["Date"])[::-1],
-                y=list(upper) + list(lower)[::-1],
-                fill="toself",
-                fillcolor="rgba(0,128,0,0.2)",
-                line=dict(color="rgba(255,255,255,0)"),
-                name="Volatility Range",
-                showlegend=True,
-            )
-        )
-
-    if "show" in toggle_probability and user_points is not None:
-        fig1.add_hline(
-            y=user_points,
-            line_dash="dash",
-            line_color="red",
-            annotation_text=f"Your Points: {user_points}",
-            annotation_position="top right",
-        )
-
-    # Change graph
-    fig2 = create_change_graph(filtered_df, promotion_column)
-    # Competitiveness
-    filtered_df["Competitiveness"] = filtered_df[promotions_col] / filtered_df[eligibles_col]
-    fig3 = px.bar(filtered_df, x="Date", y="Competitiveness", title="Competitiveness Score",
-                  color_discrete_sequence=["green"])
-
-    eligible_raw = filtered_df[eligibles_col]
-    promoted_raw = filtered_df[promotions_col]
-
-    eligible = (
-        eligible_raw.astype(str)
-        .str.replace(r"[^\d\.\-]", "", regex=True)
-        .replace("", "0")
-        .astype(float)
-    )
-
-    promoted = (
-        promoted_raw.astype(str)
-        .str.replace(r"[^\d\.\-]", "", regex=True)
-        .replace("", "0")
-        .astype(float)
-    )
-
-    promoted = np.minimum(promoted, eligible)
-    not_promoted = np.maximum(eligible - promoted, 0)
-
-    fig4 = go.Figure()
-
-    # 1) Yellow promoted on the bottom
-    fig4.add_trace(
-        go.Scatter(
-            x=filtered_df["Date"],
-            y=promoted,
-            mode="lines",
-            line=dict(width=0, color="gold"),
-            stackgroup="one",
-            fill="tozeroy",
-            name="Promoted",
-            fillcolor="gold",
-            hovertemplate="<b>Date</b>: %{x}<br><b>Promoted</b>: %{y}<extra></extra>",
-        )
+        promotion_column,
+        show_trend="trend" in trendline,
+        show_volatility="volatility" in volatility,
+        user_points=user_points if "show" in toggle_probability else None,
     )
 
-    # 2) Green not promoted stacked above it
-    fig4.add_trace(
-        go.Scatter(
-            x=filtered_df["Date"],
-            y=not_promoted,
-            mode="lines",
-            line=dict(width=0, color="green"),
-            stackgroup="one",
-            fill="tonexty",
-            name="Eligible not Promoted",
-            fillcolor="green",
-            hovertemplate="<b>Date</b>: %{x}<br><b>Eligible not Promoted</b>: %{y}<extra></extra>",
-        )
-    )
-
-    fig4.update_layout(
-        title="Historical Soldier Selection",
-        xaxis_title="Date",
-        yaxis_title="# of Soldiers",
-        showlegend=True,
-    )
+    # Change, competitiveness and streamgraph don't depend on the overlay
+    # toggles, so a full-history request can use the pre-rendered snapshot.
+    snapshot = None
+    if len(filtered_df) == get_series_length(component, mos, as_of):
+        snapshot = load_snapshot(component.upper(), mos, rank, as_of or get_dataset_version())
+    if snapshot:
+        fig2 = snapshot["figures"]["change"]
+        fig3 = snapshot["figures"]["competitiveness"]
+        fig4 = snapshot["figures"]["streamgraph"]
+    else:
+        fig2 = create_change_graph(filtered_df, promotion_column)
+        fig3 = create_competitiveness_graph(filtered_df, promotions_col, eligibles_col)
+        fig4 = create_streamgraph(filtered_df, promotions_col, eligibles_col)
 
     # Gauges
     fig5 = go.Figure(go.Indicator(
@@ -471,6 +441,39 @@ def update_graphs(
     return fig1, fig5, fig6, fig2, fig3, fig4, prob_text, f"{y_pred}", str(ci_lower), str(ci_upper), percentage_text
 
 
+# update_graphs results per (dataset version, inputs). Popularity is counted
+# per filter selection (component, MOS, rank, months), since points and
+# overlays vary per user; the warmer recomputes the most requested selections
+# with the layout defaults at startup (gunicorn.conf.py) and after a new
+# master is loaded, so the first click after a release isn't a cold one.
+POPULAR_FILTERS_FILE = Path(__file__).resolve().parent / "data" / "cache" / "popular_filters.json"
+graph_cache = ResultCache(int(os.environ.get("GRAPH_CACHE_SIZE", 128)))
+filter_popularity = FilterPopularity()
+filter_popularity.load(POPULAR_FILTERS_FILE)
+cache_warmer = CacheWarmer(
+    graph_cache,
+    filter_popularity,
+    lambda key: render_graphs(*key),
+    get_dataset_version,
+    int(os.environ.get("WARM_TOP_N", 20)),
+    cache_key=lambda selection: default_graphs_key(*selection),
+)
+# Precomputes the likely Load result once component, rank and MOS are picked
+# (see update_sidebar); SPECULATE=0 turns it off.
+speculator = Speculator(graph_cache, render_graphs, get_dataset_version)
+SPECULATE = os.environ.get("SPECULATE", "1") != "0"
+_serve_request = server.wsgi_app
+
+
+def _serve_request_busy(environ, start_response):
+    # Guesses wait while any request is being served (see Speculator).
+    with speculator.busy():
+        return _serve_request(environ, start_response)
+
+
+server.wsgi_app = _serve_request_busy
+
+
 # 3) Sidebar details (exactly your old code)
 @app.callback(
     Output("sidebar-details", "children"),
@@ -481,43 +484,106 @@ def update_graphs(
         Input("component-dropdown", "value"),
         Input("rank-dropdown", "value"),
         Input("mos-dropdown", "value"),
+        Input("as-of-dropdown", "value"),
+    ],
+    [
+        State("ci-level-dropdown", "value"),
+        State("user-points", "value"),
+        State("trendline-checkbox", "value"),
+        State("volatility-checkbox", "value"),
+        State("toggle-probability", "value"),
     ],
 )
-def update_sidebar(load_clicks, start_month, end_month, component, rank, mos):
+def update_sidebar(
+    load_clicks,
+    start_month,
+    end_month,
+    component,
+    rank,
+    mos,
+    as_of=None,
+    ci_level=95,
+    user_points=None,
+    trendline=None,
+    volatility=None,
+    toggle_probability=None,
+):
+    if SPECULATE and component and rank and mos:
+        # The dropdowns are set before Load is pressed, so start on that
+        # click's result now. Without a range yet, guess the full history.
+        dates, _ = _dropdown_options(get_dataset_version())
+        first = start_month or (dates[0]["value"] if dates else None)
+        last = end_month or (dates[-1]["value"] if dates else None)
+        if first and last:
+            key = graphs_key(ci_level, user_points, trendline, volatility, toggle_probability, first, last, component, rank, mos)
+            speculator.submit(as_of or get_dataset_version(), key, as_of=as_of)
+
     if not load_clicks or not start_month or not end_month:
         return html.P("No Data Available")
     if not rank:
         return html.P("No Rank Selected")
 
-    dff = df.copy()
-    dff["Date"] = pd.to_datetime(dff["Date"], format="%Y-%b", errors="coerce")
     start = pd.to_datetime(start_month, format="%b-%Y", errors="coerce")
     end = pd.to_datetime(end_month, format="%b-%Y", errors="coerce")
-    dff = dff[(dff["Date"] >= start) & (dff["Date"] <= end)]
-    if component:
-        dff = dff[dff["Component"].str.upper() == component.upper()]
-    if mos:
-        dff = dff[dff["MOS"] == mos]
+    _, elig, prom = rank_columns(rank)
+    if component and mos:
+        dff = select_series(component, mos, start, end, as_of)
+        total_rows = len(dff)
+    else:
+        total_rows = count_rows(start, end, component, mos, as_of)
+        dff = select_rows(start, end, component, mos, ["Date", elig, prom], SIDEBAR_MAX_ROWS, as_of)
     if dff.empty:
         return html.P("No Data Available")
 
-    elig = "Eligibles_SGT" if rank == "SGT" else "Eligibles_SSG"
-    prom = "Promotions_SGT" if rank == "SGT" else "Promotions_SSG"
-
     header = html.Thead(html.Tr([
         html.Th("Date", style={"position":"sticky","top":0,"backgroundColor":"#f8f8f8"}),
         html.Th("Eligible", style={"position":"sticky","top":0,"backgroundColor":"#f8f8f8"}),
         html.Th("Promoted", style={"position":"sticky","top":0,"backgroundColor":"#f8f8f8"}),
     ]))
-    rows = []
-    for _, row in dff.sort_values("Date").iterrows():
-        rows.append(html.Tr([
-            html.Td(row["Date"].strftime("%b-%Y")),
-            html.Td(int(row[elig]) if pd.notna(row[elig]) else "N/A"),
-            html.Td(int(row[prom]) if pd.notna(row[prom]) else "N/A"),
-        ]))
+    # Format whole columns at once; a partial selection can cover every MOS.
+    dff = dff.tail(SIDEBAR_MAX_ROWS)
+    dates = dff["Date"].dt.strftime("%b-%Y")
+    eligibles = np.trunc(dff[elig]).astype("Int64").astype(str).replace("<NA>", "N/A")
+    promoted = np.trunc(dff[prom]).astype("Int64").astype(str).replace("<NA>", "N/A")
+    rows = [
+        html.Tr([html.Td(date), html.Td(eligible), html.Td(promotion)])
+        for date, eligible, promotion in zip(dates, eligibles, promoted)
+    ]
     body = html.Tbody(rows)
-    return html.Table([header, body], style={"width":"100%","borderCollapse":"collapse"})
+    table = html.Table([header, body], style={"width":"100%","borderCollapse":"collapse"})
+    if total_rows > len(dff):
+        return html.Div([html.P(f"Showing the latest {len(dff):,} of {total_rows:,} rows"), table])
+    return table
+
+
+# Dropdown choices come from the loaded master. The page layout is built once
+# at import, so refresh them on every visit to pick up a newly published
+# master (see data_loader.refresh_if_changed) without a restart.
+@lru_cache(maxsize=2)
+def _dropdown_options(dataset_version):
+    dates = [{"label": d, "value": d} for d in get_available_dates()]
+    mos = [{"label": m, "value": m} for m in get_mos_list()]
+    return dates, mos
+
+
+def _as_of_options():
+    """Recorded releases, newest first; no selection means the one being served."""
+    return [
+        {"label": f"{entry['recorded_at'][:10]} ({entry['version'][:8]})", "value": entry["version"]}
+        for entry in reversed(list_versions())
+    ]
+
+
+@app.callback(
+    Output("date-range-start", "options"),
+    Output("date-range-end", "options"),
+    Output("mos-dropdown", "options"),
+    Output("as-of-dropdown", "options"),
+    Input("url", "pathname"),
+)
+def refresh_dropdown_options(pathname):
+    dates, mos = _dropdown_options(get_dataset_version())
+    return dates, dates, mos, _as_of_options()
 
 
 # 4) Dark‑mode toggle (now includes header)
@@ -567,12 +633,13 @@ from dash import Input, Output
         Output("header-container",     "style"),
         Output("page-content",         "style"),
         Output("dashboard-page-wrapper","className"),
-        # your 7 labels:
+        # your 8 labels:
         Output("label-load-data-from", "style"),
         Output("label-load-data-to",   "style"),
         Output("label-component",      "style"),
         Output("label-rank",           "style"),
         Output("label-mos-code",       "style"),
+        Output("label-as-of",          "style"),
         Output("label-user-prompts",   "style"),
         Output("label-details-title",  "style"),
         # the switch labelStyle:
@@ -583,6 +650,7 @@ from dash import Input, Output
         Output("component-dropdown",  "style"),
         Output("rank-dropdown",       "style"),
         Output("mos-dropdown",        "style"),
+        Output("as-of-dropdown",      "style"),
         Output("user-points",         "style"),
     ],
     Input("dark-mode-store", "data"),
@@ -609,7 +677,7 @@ def apply_dark_mode(is_dark):
         "textAlign":    "center",
         "color":        "white" if is_dark else "black",
     }
-    labels = [label_common] * 7
+    labels = [label_common] * 8
 
     # 3) Switch label
     switch_label = {
@@ -641,6 +709,7 @@ def apply_dark_mode(is_dark):
         dropdown_style,  # component-dropdown
         small_dd,        # rank-dropdown
         small_dd,        # mos-dropdown
+        dropdown_style,  # as-of-dropdown
         user_pts_style   # user-points
     )
 
@@ -662,4 +731,6 @@ def toggle_switch_visibility(pathname):
 
 
 if __name__ == "__main__":
+    cache_warmer.warm()
+    cache_warmer.start(RELOAD_CHECK_SECONDS, POPULAR_FILTERS_FILE)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,10 @@
+# dashboard_scripts/calculate_historical_probability.py
+
+def calculate_historical_probability(filtered_df, promotion_column, user_points):
+    """
+    Percentage of months in filtered_df whose cutoff was at or below user_points.
+    Returns 0 when no points were given or there is no data.
+    """
+    if user_points is None or filtered_df.empty:
+        return 0
+    return (filtered_df[promotion_column] <= user_points).sum() / len(filtered_df) * 100
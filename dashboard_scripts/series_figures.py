@@ -0,0 +1,129 @@
+# dashboard_scripts/series_figures.py
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def create_promotion_graph(filtered_df, promotion_column, show_trend=False, show_volatility=False, user_points=None):
+    """
+    Creates the "Promotion Points Over Time" line chart.
+
+    Args:
+        filtered_df (pd.DataFrame): One MOS/component series sorted by Date.
+        promotion_column (str): Cutoff column to plot.
+        show_trend (bool): Overlay an OLS trend line.
+        show_volatility (bool): Overlay a rolling 3-month volatility band.
+        user_points (int | None): Draw the user's points as a horizontal line.
+
+    Returns:
+        go.Figure
+    """
+    fig = px.line(
+        filtered_df,
+        x="Date",
+        y=promotion_column,
+        title="Promotion Points Over Time",
+        markers=True,
+        color_discrete_sequence=["green"],
+        labels={promotion_column: "MOS Cutoffs"},
+    )
+    fig.update_traces(name="MOS Cutoff Points", showlegend=True)
+
+    if show_trend:
+        x_vals = np.arange(len(filtered_df))
+        y_vals = filtered_df[promotion_column].dropna()
+        if len(y_vals) > 1:
+            poly = np.polyfit(x_vals, y_vals, 1)
+            line = np.poly1d(poly)(x_vals)
+            fig.add_scatter(x=filtered_df["Date"], y=line, mode="lines",
+                            line=dict(color="gold", dash="solid"), name="Trend Line")
+
+    if show_volatility:
+        filtered_df["SE"] = filtered_df[promotion_column].rolling(3, min_periods=1).std()
+        upper = (filtered_df[promotion_column] + filtered_df["SE"]).clip(upper=798)
+        lower = (filtered_df[promotion_column] - 0.5 * filtered_df["SE"]).clip(lower=0)
+        fig.add_traces(
+            go.Scatter(
+                x=list(filtered_df["Date"]) + list(filtered_df["Date"])[::-1],
+                y=list(upper) + list(lower)[::-1],
+                fill="toself",
+                fillcolor="rgba(0,128,0,0.2)",
+                line=dict(color="rgba(255,255,255,0)"),
+                name="Volatility Range",
+                showlegend=True,
+            )
+        )
+
+    if user_points is not None:
+        fig.add_hline(
+            y=user_points,
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Your Points: {user_points}",
+            annotation_position="top right",
+        )
+
+    return fig
+
+
+def create_competitiveness_graph(filtered_df, promotions_col, eligibles_col):
+    """
+    Creates the "Competitiveness Score" bar chart (promotions / eligibles per month).
+    """
+    filtered_df["Competitiveness"] = filtered_df[promotions_col] / filtered_df[eligibles_col]
+    return px.bar(filtered_df, x="Date", y="Competitiveness", title="Competitiveness Score",
+                  color_discrete_sequence=["green"])
+
+
+def create_streamgraph(filtered_df, promotions_col, eligibles_col):
+    """
+    Creates the "Historical Soldier Selection" stacked area chart of promoted
+    versus eligible-but-not-promoted soldiers.
+    """
+    # Counts are float64 from the compile stage; a missing month counts as 0.
+    eligible = filtered_df[eligibles_col].fillna(0)
+    promoted = filtered_df[promotions_col].fillna(0)
+
+    promoted = np.minimum(promoted, eligible)
+    not_promoted = np.maximum(eligible - promoted, 0)
+
+    fig = go.Figure()
+
+    # 1) Yellow promoted on the bottom
+    fig.add_trace(
+        go.Scatter(
+            x=filtered_df["Date"],
+            y=promoted,
+            mode="lines",
+            line=dict(width=0, color="gold"),
+            stackgroup="one",
+            fill="tozeroy",
+            name="Promoted",
+            fillcolor="gold",
+            hovertemplate="<b>Date</b>: %{x}<br><b>Promoted</b>: %{y}<extra></extra>",
+        )
+    )
+
+    # 2) Green not promoted stacked above it
+    fig.add_trace(
+        go.Scatter(
+            x=filtered_df["Date"],
+            y=not_promoted,
+            mode="lines",
+            line=dict(width=0, color="green"),
+            stackgroup="one",
+            fill="tonexty",
+            name="Eligible not Promoted",
+            fillcolor="green",
+            hovertemplate="<b>Date</b>: %{x}<br><b>Eligible not Promoted</b>: %{y}<extra></extra>",
+        )
+    )
+
+    fig.update_layout(
+        title="Historical Soldier Selection",
+        xaxis_title="Date",
+        yaxis_title="# of Soldiers",
+        showlegend=True,
+    )
+
+    return fig
@@ -0,0 +1,117 @@
+# dashboard_scripts/snapshots.py
+"""
+Pre-rendered per-series snapshots (see scripts/export_snapshots.py).
+
+One compact JSON file per (component, MOS, rank) holding the full-history
+figures, the default 95% forecast and summary stats, tagged with the dataset
+version they were rendered from. The dashboard serves those figures straight
+from the file when a request covers the whole history, and /api/snapshot
+exposes the files for CDN/static hosting.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from dashboard_scripts.calculate_promotion_percentage import calculate_promotion_percentage
+from dashboard_scripts.predict_next_promotion import predict_next_promotion_points
+from dashboard_scripts.series_figures import create_competitiveness_graph, create_promotion_graph, create_streamgraph
+from dashboard_scripts.update_change_graph import create_change_graph
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SNAPSHOT_DIR = PROJECT_ROOT / "data" / "snapshots"
+SNAPSHOT_INDEX = SNAPSHOT_DIR / "index.json"
+
+DEFAULT_CI_LEVEL = 95
+
+
+def snapshot_path(component, mos, rank, snapshot_dir=SNAPSHOT_DIR):
+    return Path(snapshot_dir) / str(component).upper() / f"{mos}_{str(rank).upper()}.json"
+
+
+def _figure_dict(fig):
+    # Round-trip through plotly's encoder so dates/NumPy arrays become plain JSON.
+    return json.loads(fig.to_json())
+
+
+def _none_if_nan(value):
+    return None if pd.isna(value) else float(value)
+
+
+def build_snapshot(series_df, component, mos, rank, dataset_version):
+    """
+    Renders the default (full-history, no overlays) view of one series.
+
+    Args:
+        series_df (pd.DataFrame): Full date-sorted history of one component/MOS.
+        component (str), mos (str), rank (str): Series key.
+        dataset_version (str): Version of the master dataset being rendered.
+
+    Returns:
+        dict: JSON-serialisable snapshot.
+    """
+    cutoff_col = f"Cutoff_{rank}"
+    eligibles_col = f"Eligibles_{rank}"
+    promotions_col = f"Promotions_{rank}"
+    df = series_df.copy()
+
+    predicted, interval = predict_next_promotion_points(df, cutoff_col, ci_level=DEFAULT_CI_LEVEL)
+    cutoffs = df[cutoff_col]
+
+    return {
+        "component": str(component).upper(),
+        "mos": mos,
+        "rank": rank,
+        "dataset_version": dataset_version,
+        "start": df["Date"].min().strftime("%Y-%m"),
+        "end": df["Date"].max().strftime("%Y-%m"),
+        "forecast": {
+            "ci_level": DEFAULT_CI_LEVEL,
+            "predicted_cutoff": predicted,
+            "ci_lower": interval[0] if interval else None,
+            "ci_upper": interval[1] if interval else None,
+        },
+        "stats": {
+            "months": len(df),
+            "latest_cutoff": _none_if_nan(cutoffs.iloc[-1]),
+            "min_cutoff": _none_if_nan(cutoffs.min()),
+            "max_cutoff": _none_if_nan(cutoffs.max()),
+            "mean_cutoff": _none_if_nan(cutoffs.mean()),
+            "percent_promoted": float(calculate_promotion_percentage(df, promotions_col, eligibles_col)),
+        },
+        "figures": {
+            "promotion": _figure_dict(create_promotion_graph(df, cutoff_col)),
+            "change": _figure_dict(create_change_graph(df, cutoff_col)),
+            "competitiveness": _figure_dict(create_competitiveness_graph(df, promotions_col, eligibles_col)),
+            "streamgraph": _figure_dict(create_streamgraph(df, promotions_col, eligibles_col)),
+        },
+    }
+
+
+def load_snapshot(component, mos, rank, dataset_version):
+    """
+    Returns the parsed snapshot for a series, or None when there is no file or
+    it was rendered from a different dataset version.
+
+    Parsed files are cached by modification time, so a snapshot exported
+    after the dashboard already picked up a new master is seen on the next
+    request instead of the earlier miss sticking for the whole release.
+    """
+    path = snapshot_path(component, mos, rank)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    snapshot = _read_snapshot(path, stat.st_mtime_ns, stat.st_size)
+    if snapshot is None or snapshot.get("dataset_version") != dataset_version:
+        return None
+    return snapshot
+
+
+@lru_cache(maxsize=256)
+def _read_snapshot(path, mtime_ns, size):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
@@ -1,16 +1,535 @@
+import difflib
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent
 LOCAL_CSV_PATH = BASE_DIR / "data" / "master" / "master_promotion_data.csv"
+NUMERIC_COLUMNS = [f"{kind}_{rank}" for kind in ("Cutoff", "Eligibles", "Promotions") for rank in ("SGT", "SSG")]
+MASTER_COLUMNS = ["Date", "Component", "MOS"] + NUMERIC_COLUMNS
+
+# "csv" keeps the whole master in memory in every process. "sqlite" answers
+# each query from LOCAL_DB_PATH (built by scripts/build_database.py) and only
+# holds what a request asks for. The master is small next to the libraries:
+# importing the app plus one API call measured ~197 MB RSS on sqlite against
+# ~202 MB on csv, so the backend alone won't fit a process into a much
+# smaller memory limit.
+DATA_BACKEND = os.environ.get("DATA_BACKEND", "csv").lower()
+LOCAL_DB_PATH = LOCAL_CSV_PATH.with_suffix(".sqlite")
+
+# Subset a specialized deployment keeps in memory on the csv backend, e.g.
+# DATA_COMPONENT=RESERVE for a Reserve-only instance. Comma-separated lists;
+# DATA_SINCE is a first month, YYYY-MM. See load_master_df.
+DATA_FILTERS = {
+    "component": [c for c in os.environ.get("DATA_COMPONENT", "").split(",") if c] or None,
+    "mos": [m for m in os.environ.get("DATA_MOS", "").split(",") if m] or None,
+    "since": os.environ.get("DATA_SINCE") or None,
+}
+
+# Append-only history of every release, see record_version.
+VERSIONS_DIR = LOCAL_CSV_PATH.parent / "versions"
+# A full copy every this many releases keeps rebuilding an old one to a short chain of diffs.
+CHECKPOINT_EVERY = 12
+# Versions are the first 16 hex digits of the master's sha256 (_content_version).
+VERSION_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+# How often (seconds) to stat the master file for a new release; 0 disables reloading.
+RELOAD_CHECK_SECONDS = float(os.environ.get("DATA_RELOAD_SECONDS", 10))
+
+_master = None  # (frame, dataset version), always replaced together
+_series_index = None
+_loaded_signature = None
+_last_check = 0.0
+_reload_lock = threading.Lock()
+_db_local = threading.local()
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+def _partition_index(source):
+    """The partition index next to a master CSV, if it was written from that exact file."""
+    try:
+        source = Path(source)
+        index = json.loads((source.parent / "partitions" / "index.json").read_text(encoding="utf-8"))
+        stat = source.stat()
+    except (OSError, TypeError, ValueError):
+        return None
+    if index.get("master") != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}:
+        return None
+    return index
+
+def load_master_df(source=LOCAL_CSV_PATH, component=None, mos=None, since=None, columns=None):
+    """
+    Reads a master CSV. component and mos (a value or a list), since (first
+    month) and columns narrow what is returned. When the compile stage's
+    partitions next to source match it (see
+    compile_master_dataset.write_partitions), only the component/year
+    partitions a filter can match are read, and only the needed columns are
+    parsed. Otherwise the filters are applied to the whole file.
+    """
+    since = None if since is None else pd.Timestamp(since)
+    needed = (["Component"] if component else []) + (["MOS"] if mos else []) + (["Date"] if since is not None else [])
+    usecols = None if columns is None else list(dict.fromkeys(list(columns) + needed))
+    dtype = {"Component": str, "MOS": str}
+
+    index = _partition_index(source) if (component or mos or since is not None or columns) else None
+    if index is not None:
+        components = None if not component else {str(c).upper() for c in _as_list(component)}
+        parts = [
+            entry for entry in index["partitions"]
+            if (components is None or entry["component"] in components)
+            and (since is None or (entry["year"] or 0) >= since.year)
+        ]
+        folder = Path(source).parent / "partitions"
+        frames = [pd.read_csv(folder / entry["path"], usecols=usecols, dtype=dtype) for entry in parts]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=usecols or index["columns"])
+    else:
+        df = pd.read_csv(source, usecols=usecols, dtype=dtype)
 
-def load_master_df():
-    df = pd.read_csv(LOCAL_CSV_PATH)
     if "Date" in df.columns:
         df["Date"] = pd.to_datetime(df["Date"], format="%Y-%b", errors="coerce")
-    return df
+    # The compile stage writes clean numbers; coerce once here so figures never see text.
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+
+    if component:
+        df = df[df["Component"].str.upper().isin({str(c).upper() for c in _as_list(component)})]
+    if mos:
+        df = df[df["MOS"].isin(_as_list(mos))]
+    if since is not None:
+        df = df[df["Date"] >= since]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+def _content_version(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _file_signature():
+    path = LOCAL_DB_PATH if DATA_BACKEND == "sqlite" else LOCAL_CSV_PATH
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    # The pipeline publishes with os.replace, so a new release is a new inode.
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+def refresh_if_changed(force=False):
+    """
+    Drops the loaded dataset when the master file on disk has been replaced,
+    so the next get_master_df() call picks up the new release. The file is
+    stat'ed at most every RELOAD_CHECK_SECONDS unless force is set.
+    """
+    global _master, _series_index, _loaded_signature, _last_check
+    if _loaded_signature is None or not (RELOAD_CHECK_SECONDS or force):
+        return
+    now = time.monotonic()
+    if not force and now - _last_check < RELOAD_CHECK_SECONDS:
+        return
+    with _reload_lock:
+        _last_check = now
+        signature = _file_signature()
+        if signature is not None and signature != _loaded_signature:
+            _master = _series_index = _loaded_signature = None
+
+def get_master_df(as_of=None):
+    """
+    Returns the master dataset (only the DATA_FILTERS subset, if any are
+    set), loading it once per release.
+    app.py and every page share this frame, and a preloading server
+    (see gunicorn.conf.py) loads it before forking so workers share its pages.
+    When the pipeline publishes a new master the next call loads it instead.
+    With as_of, returns that recorded release instead (see record_version).
+    """
+    if is_historical_version(as_of):
+        return _version_data(as_of)[0]
+    return _loaded_master()[0]
+
+def _loaded_master():
+    """
+    The current (frame, dataset version) pair, loading it if needed. Callers
+    take both from this one tuple, so a concurrent reload can't pair a frame
+    with another release's version (or with None).
+    """
+    global _master, _loaded_signature
+    refresh_if_changed()
+    master = _master
+    if master is None:
+        db = _db() if DATA_BACKEND == "sqlite" else None
+        with _reload_lock:
+            if _master is None and db is not None:
+                _master = (pd.DataFrame(_query_arrays(db, MASTER_COLUMNS, "1", [], "rowid")), _db_local.version)
+            elif _master is None:
+                _loaded_signature = _file_signature()
+                filters = {name: value for name, value in DATA_FILTERS.items() if value}
+                index = _partition_index(LOCAL_CSV_PATH) if filters else None
+                if index is not None:
+                    version = index["dataset_version"]
+                    df = load_master_df(LOCAL_CSV_PATH, **filters)
+                else:
+                    # Hash and parse the same bytes so the version always matches the frame.
+                    data = LOCAL_CSV_PATH.read_bytes()
+                    version = _content_version(data)
+                    df = load_master_df(io.BytesIO(data), **filters)
+                if "since" in filters:
+                    # Series are cut short, so they mustn't share full-history snapshots or ETags.
+                    version += pd.Timestamp(filters["since"]).strftime("-since%Y%m")
+                _master = (df, version)
+            master = _master
+    return master
+
+def get_dataset_version():
+    """Short content hash of the loaded master file, used as a cache key (e.g. API ETags)."""
+    if DATA_BACKEND == "sqlite":
+        _db()
+        return _db_local.version  # read with this thread's connection, so it matches its queries
+    return _loaded_master()[1]
+
+def write_database(source=LOCAL_CSV_PATH, path=LOCAL_DB_PATH):
+    """
+    Builds the SQLite copy of a master CSV for DATA_BACKEND=sqlite, indexed on
+    (Component, MOS, Date). It records the CSV's dataset version, so both
+    backends share snapshot files and cache keys. Written to a temporary file
+    and renamed into place. Returns the number of rows.
+    """
+    path = Path(path)
+    data = Path(source).read_bytes()
+    df = load_master_df(io.BytesIO(data))[MASTER_COLUMNS].astype(object)
+    df["Date"] = pd.to_datetime(df["Date"]).dt.strftime("%Y-%m-%d")
+    df = df.where(df.notna(), None)
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    columns = ", ".join(
+        f'"{column}" ' + ("REAL" if column in NUMERIC_COLUMNS else "TEXT COLLATE NOCASE" if column == "Component" else "TEXT")
+        for column in MASTER_COLUMNS
+    )
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(f"CREATE TABLE master ({columns})")
+        conn.executemany(
+            f"INSERT INTO master VALUES ({', '.join('?' * len(MASTER_COLUMNS))})",
+            df.itertuples(index=False, name=None),
+        )
+        conn.execute("CREATE INDEX master_series ON master (Component, MOS, Date)")
+        conn.execute("CREATE INDEX master_date ON master (Date)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO meta VALUES ('dataset_version', ?)", (_content_version(data),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return len(df)
+
+def list_versions(store=VERSIONS_DIR):
+    """Every release recorded by record_version(), oldest first."""
+    try:
+        text = (Path(store) / "log.jsonl").read_text(encoding="utf-8")
+    except OSError:
+        return []
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def is_known_version(version, store=VERSIONS_DIR):
+    """True when version is well-formed and recorded in the store's log."""
+    if not isinstance(version, str) or not VERSION_PATTERN.fullmatch(version):
+        return False
+    return any(entry["version"] == version for entry in list_versions(store))
+
+def _version_lines(version, store):
+    with gzip.open(Path(store) / f"{version}.json.gz", "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload["parent"] is None:
+        return payload["lines"]
+    parent = _version_lines(payload["parent"], store)
+    lines = []
+    for op in payload["ops"]:
+        if op[0] == "=":
+            lines.extend(parent[op[1]:op[2]])
+        else:
+            lines.extend(op[1])
+    return lines
+
+def read_version(version, store=VERSIONS_DIR):
+    """
+    The master CSV bytes of a recorded release, checked against its version
+    hash. Raises KeyError for a version the log doesn't list, so arbitrary
+    input never reaches the filesystem, and ValueError if the stored copy is
+    damaged.
+    """
+    if not is_known_version(version, store):
+        raise KeyError(f"Unknown dataset version {version}")
+    try:
+        data = "".join(_version_lines(version, store)).encode("utf-8")
+    except FileNotFoundError:
+        raise ValueError(f"Dataset version {version} is missing from the version store") from None
+    if _content_version(data) != version:
+        raise ValueError(f"Dataset version {version} failed its integrity check")
+    return data
+
+def record_version(source=LOCAL_CSV_PATH, store=VERSIONS_DIR):
+    """
+    Adds the master in source to the append-only version store, unless that
+    release is already in it. A release is kept as a line diff against the
+    previous one (usually a month of new rows), with a full copy every
+    CHECKPOINT_EVERY releases or when the diff would be over half the file.
+    Returns the new log entry, or None if the release was already recorded.
+    """
+    store = Path(store)
+    data = Path(source).read_bytes()
+    version = _content_version(data)
+    log = list_versions(store)
+    if any(entry["version"] == version for entry in log):
+        return None
+
+    lines = data.decode("utf-8").splitlines(keepends=True)
+    payload, depth = {"parent": None, "lines": lines}, 0
+    parent = log[-1] if log else None
+    if parent is not None and parent["depth"] + 1 < CHECKPOINT_EVERY:
+        ops, inserted = [], 0
+        matcher = difflib.SequenceMatcher(None, _version_lines(parent["version"], store), lines, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                ops.append(["=", i1, i2])
+            elif j2 > j1:
+                ops.append(["+", lines[j1:j2]])
+                inserted += j2 - j1
+        if inserted * 2 < len(lines):
+            payload, depth = {"parent": parent["version"], "ops": ops}, parent["depth"] + 1
+
+    store.mkdir(parents=True, exist_ok=True)
+    path = store / f"{version}.json.gz"
+    tmp_path = path.with_suffix(".gz.tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+    entry = {
+        "version": version,
+        "parent": payload["parent"],
+        "depth": depth,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "rows": len(lines) - 1,
+        "bytes": path.stat().st_size,
+    }
+    with open(store / "log.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return entry
+
+@lru_cache(maxsize=4)
+def _version_data(version):
+    filters = {name: value for name, value in DATA_FILTERS.items() if value}
+    df = load_master_df(io.BytesIO(read_version(version)), **filters)
+    return df, build_series_index(df)
+
+def is_historical_version(as_of):
+    """True when as_of names a recorded release other than the one being served."""
+    return as_of is not None and as_of != get_dataset_version().split("-", 1)[0]
+
+def _db():
+    """
+    This thread's read-only connection to the loaded database release. Opened
+    per thread and per process (a preloading server forks after import), and
+    reopened once refresh_if_changed() notices a new release.
+    """
+    global _loaded_signature
+    refresh_if_changed()
+    key = (os.getpid(), _loaded_signature)
+    if _loaded_signature is None or getattr(_db_local, "key", None) != key:
+        if not LOCAL_DB_PATH.exists():
+            raise FileNotFoundError(f"{LOCAL_DB_PATH} not found; build it with python scripts/build_database.py")
+        with _reload_lock:
+            signature = _file_signature()
+            conn = sqlite3.connect(f"{LOCAL_DB_PATH.as_uri()}?mode=ro", uri=True)
+            _loaded_signature = signature
+        version = conn.execute("SELECT value FROM meta WHERE key = 'dataset_version'").fetchone()[0]
+        old = getattr(_db_local, "conn", None)
+        if old is not None:
+            old.close()
+        _db_local.conn, _db_local.key, _db_local.version = conn, (os.getpid(), signature), version
+    return _db_local.conn
+
+def _db_date(value):
+    """A timestamp as stored in the database; dates sort as text."""
+    value = pd.Timestamp(value)
+    return value.strftime("%Y-%m-%d" if value == value.normalize() else "%Y-%m-%d %H:%M:%S")
+
+def _where(component=None, mos=None, start=None, end=None):
+    clauses, params = ['"Date" IS NOT NULL'], []
+    if component:
+        clauses.append('"Component" = ?')
+        params.append(str(component))
+    if mos:
+        clauses.append('"MOS" = ?')
+        params.append(mos)
+    for bound, op in ((start, ">="), (end, "<=")):
+        if bound is None:
+            continue
+        if pd.isna(bound):
+            clauses.append("0")  # an unparseable bound matches nothing, as in pandas
+        else:
+            clauses.append(f'"Date" {op} ?')
+            params.append(_db_date(bound))
+    return " AND ".join(clauses), params
+
+def _query_arrays(db, columns, where, params, order_by='"Date", rowid', limit=-1):
+    unknown = [column for column in columns if column not in MASTER_COLUMNS]
+    if unknown:
+        raise KeyError(f"Unknown master columns: {unknown}")
+    select = ", ".join(f'"{column}"' for column in columns)
+    sql = f"SELECT {select} FROM master WHERE {where} ORDER BY {order_by} LIMIT ?"
+    rows = db.execute(sql, params + [limit]).fetchall()
+    values = zip(*rows) if rows else [()] * len(columns)
+    arrays = {}
+    for column, column_values in zip(columns, values):
+        if column == "Date":
+            arrays[column] = np.array(column_values, dtype="datetime64[ns]")
+        elif column in NUMERIC_COLUMNS:
+            arrays[column] = np.array(column_values, dtype="float64")
+        else:
+            arrays[column] = np.array(column_values, dtype=object)
+    return arrays
 
 def get_sorted_dates(df):
     if df is None or df.empty or "Date" not in df.columns:
         return []
-    return df["Date"].dropna().sort_values().dt.strftime("%b-%Y").unique().tolist()
\ No newline at end of file
+    return df["Date"].dropna().sort_values().dt.strftime("%b-%Y").unique().tolist()
+
+def get_available_dates():
+    """Every month on record as "%b-%Y", oldest first (get_sorted_dates on the master)."""
+    if DATA_BACKEND == "sqlite":
+        rows = _db().execute('SELECT DISTINCT "Date" FROM master WHERE "Date" IS NOT NULL ORDER BY "Date"').fetchall()
+        return pd.to_datetime([date for (date,) in rows]).strftime("%b-%Y").unique().tolist()
+    return get_sorted_dates(get_master_df())
+
+def get_mos_list():
+    """Every MOS on record, in the order they first appear in the master."""
+    if DATA_BACKEND == "sqlite":
+        rows = _db().execute(
+            'SELECT "MOS" FROM master WHERE "MOS" IS NOT NULL GROUP BY "MOS" ORDER BY MIN(rowid)'
+        ).fetchall()
+        return [mos for (mos,) in rows]
+    df = get_master_df()
+    return df["MOS"].dropna().unique().tolist() if "MOS" in df.columns else []
+
+def rank_columns(rank):
+    """Returns the (cutoff, eligibles, promotions) column names for SGT or SSG."""
+    rank = "SGT" if str(rank).upper() == "SGT" else "SSG"
+    return f"Cutoff_{rank}", f"Eligibles_{rank}", f"Promotions_{rank}"
+
+def build_series_index(df):
+    """
+    Splits the master frame into one date-sorted frame per (COMPONENT, MOS),
+    so a lookup is a dict hit plus a binary search on Date instead of a
+    full-table scan.
+    """
+    df = df.dropna(subset=["Date"])
+    keys = df["Component"].astype(str).str.upper()
+    return {
+        (component, mos): group.sort_values("Date", kind="stable").reset_index(drop=True)
+        for (component, mos), group in df.groupby([keys, "MOS"], sort=False)
+    }
+
+def get_series_index(as_of=None):
+    global _series_index
+    if is_historical_version(as_of):
+        return _version_data(as_of)[1]
+    df = get_master_df()
+    # Stored with the frame it was built from, so a reload never pairs a new
+    # frame with the old index.
+    built = _series_index
+    if built is None or built[0] is not df:
+        built = (df, build_series_index(df))
+        _series_index = built
+    return built[1]
+
+def get_series_length(component, mos, as_of=None):
+    """Number of months on record for one component/MOS (0 if unknown)."""
+    if DATA_BACKEND == "sqlite" and not is_historical_version(as_of):
+        where, params = _where(component, mos)
+        return _db().execute(f"SELECT COUNT(*) FROM master WHERE {where}", params).fetchone()[0]
+    series = get_series_index(as_of).get((str(component).upper(), mos))
+    return 0 if series is None else len(series)
+
+def query_series(component, mos, start=None, end=None, columns=None, as_of=None):
+    """
+    Returns one component/MOS series between start and end (inclusive, either
+    may be None) as {column: NumPy array}, sorted by Date. columns defaults to
+    every master column. On the SQLite backend only the matching rows and the
+    requested columns are read, via the (Component, MOS, Date) index.
+    as_of selects a recorded release other than the current one.
+    """
+    columns = list(columns or MASTER_COLUMNS)
+    if DATA_BACKEND == "sqlite" and not is_historical_version(as_of):
+        where, params = _where(component, mos, start, end)
+        return _query_arrays(_db(), columns, where, params)
+    series = select_series(component, mos, start, end, as_of)
+    return {column: series[column].to_numpy() for column in columns}
+
+def _rows_mask(df, start, end, component, mos):
+    mask = df["Date"].notna()
+    if start is not None:
+        mask &= df["Date"] >= start
+    if end is not None:
+        mask &= df["Date"] <= end
+    if component:
+        mask &= df["Component"].str.upper() == str(component).upper()
+    if mos:
+        mask &= df["MOS"] == mos
+    return mask
+
+def count_rows(start=None, end=None, component=None, mos=None, as_of=None):
+    """Number of rows select_rows() would return without latest."""
+    if DATA_BACKEND == "sqlite" and not is_historical_version(as_of):
+        where, params = _where(component, mos, start, end)
+        return _db().execute(f"SELECT COUNT(*) FROM master WHERE {where}", params).fetchone()[0]
+    return int(_rows_mask(get_master_df(as_of), start, end, component, mos).sum())
+
+def select_rows(start=None, end=None, component=None, mos=None, columns=None, latest=None, as_of=None):
+    """
+    Returns a copy of the dated rows between start and end, optionally for one
+    component and/or MOS, sorted by Date; with latest, only that many of the
+    most recent. For partial selections; a full component/MOS pair should use
+    select_series.
+    """
+    columns = list(columns or MASTER_COLUMNS)
+    if DATA_BACKEND == "sqlite" and not is_historical_version(as_of):
+        where, params = _where(component, mos, start, end)
+        if latest is None:
+            return pd.DataFrame(_query_arrays(_db(), columns, where, params))
+        newest_first = _query_arrays(_db(), columns, where, params, '"Date" DESC, rowid DESC', latest)
+        return pd.DataFrame({column: values[::-1] for column, values in newest_first.items()})
+    df = get_master_df(as_of)
+    rows = df.loc[_rows_mask(df, start, end, component, mos), columns].sort_values("Date", kind="stable")
+    return rows if latest is None else rows.tail(latest)
+
+def select_series(component, mos, start=None, end=None, as_of=None):
+    """
+    Returns a copy of the rows for one component/MOS between start and end
+    (inclusive timestamps, either may be None), sorted by Date, from the
+    current release or the recorded release as_of.
+    Callers are free to add columns to the returned frame.
+    """
+    if DATA_BACKEND == "sqlite" and not is_historical_version(as_of):
+        return pd.DataFrame(query_series(component, mos, start, end))
+    series = get_series_index(as_of).get((str(component).upper(), mos))
+    if series is None:
+        return get_master_df(as_of).iloc[0:0].copy()
+
+    dates = series["Date"].values
+    lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start).to_datetime64(), side="left")
+    hi = len(series) if end is None else dates.searchsorted(pd.Timestamp(end).to_datetime64(), side="right")
+    return series.iloc[lo:hi].copy()
@@ -0,0 +1,95 @@
+"""
+gunicorn.conf.py
+
+Production serving config for the dashboard. Picked up automatically by
+`gunicorn wsgi:server` when run from the repo root.
+
+- preload_app imports app.py (and the master dataset) in the master process,
+  so forked workers share those pages copy-on-write.
+- gthread workers sized to the CPU count; callbacks are mostly NumPy/pandas
+  work that releases the GIL, and the threads absorb slow mobile clients.
+- Workers are recycled after MAX_REQUESTS requests or once their RSS goes over
+  WORKER_MAX_RSS_MB, whichever comes first.
+- A master published by the pipeline (e.g. scripts/ingest_daemon.py) is
+  picked up by each worker within DATA_RELOAD_SECONDS, see
+  data_loader.refresh_if_changed. The reloaded frame is per worker rather
+  than shared, so HUP after a release to get the sharing back.
+- The master warms app.graph_cache with the most requested dashboard
+  results (WARM_TOP_N, see result_cache.py) before forking, and each worker
+  re-warms in the background after loading a new master. Workers merge
+  their request counts into data/cache/popular_filters.json periodically
+  and on exit.
+- `kill -HUP <master pid>` gracefully replaces all workers. With preload_app
+  the master keeps the imported code, so deploy new code with USR2 + QUIT
+  (or a full restart).
+
+Every setting can be overridden with an environment variable of the same name.
+"""
+
+import gc
+import multiprocessing
+import os
+
+import psutil
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8050')}")
+
+preload_app = True
+worker_class = "gthread"
+workers = _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count())
+threads = _env_int("GUNICORN_THREADS", 4)
+
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+max_requests = _env_int("MAX_REQUESTS", 2000)
+max_requests_jitter = _env_int("MAX_REQUESTS_JITTER", 200)
+WORKER_MAX_RSS_MB = _env_int("WORKER_MAX_RSS_MB", 512)
+
+accesslog = os.environ.get("ACCESS_LOG", "-")
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    from app import cache_warmer
+
+    computed, seconds = cache_warmer.warm()
+    server.log.info("Warmed %s cached results in %.1fs", computed, seconds)
+
+    # Everything imported so far (Dash app, layout, master dataset) is shared
+    # with the workers. Freezing it keeps the GC from touching those objects
+    # and dirtying the shared pages in every worker.
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        "Preloaded app; starting %s %s workers x %s threads",
+        server.cfg.workers, server.cfg.worker_class_str, server.cfg.threads,
+    )
+
+
+def post_fork(server, worker):
+    from app import POPULAR_FILTERS_FILE, RELOAD_CHECK_SECONDS, cache_warmer
+
+    cache_warmer.start(RELOAD_CHECK_SECONDS, POPULAR_FILTERS_FILE)
+
+
+def worker_exit(server, worker):
+    from app import POPULAR_FILTERS_FILE, filter_popularity
+
+    filter_popularity.save(POPULAR_FILTERS_FILE)
+
+
+def post_request(worker, req, environ, resp):
+    rss_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+    if rss_mb > WORKER_MAX_RSS_MB and worker.alive:
+        worker.log.info(
+            "Worker %s at %.0f MB RSS (limit %s MB), recycling",
+            worker.pid, rss_mb, WORKER_MAX_RSS_MB,
+        )
+        worker.alive = False
@@ -4,7 +4,7 @@ from dash import html, dcc
 import pandas as pd
 import requests
 import dash_bootstrap_components as dbc
-from data_loader import load_master_df, get_sorted_dates
+from data_loader import get_available_dates, get_mos_list
 from dash import Input, Output, callback
 
 from dashboard_scripts.update_change_graph import create_change_graph
@@ -13,8 +13,7 @@ from dashboard_scripts.predict_next_promotion import predict_next_promotion_poin
 from dashboard_scripts.calculate_promotion_percentage import calculate_promotion_percentage
 
 dash.register_page(__name__, path="/", name="Home", order=0)
-df = load_master_df()
-sorted_dates = get_sorted_dates(df)
+sorted_dates = get_available_dates()
 
 
 coming_soon_url = "https://raw.githubusercontent.com/DanMacCode/promotion_point_dashboard/refs/heads/main/data/master/coming_soon.md"
@@ -143,14 +142,27 @@ layout = html.Div(
                                 ),
                                 dcc.Dropdown(
                                     id="mos-dropdown",
-                                    options=[{"label": mos, "value": mos} for mos in df["MOS"].unique()]
-                                    if (not df.empty and "MOS" in df.columns)
-                                    else [],
+                                    options=[{"label": mos, "value": mos} for mos in get_mos_list()],
                                     placeholder="Select MOS",
                                     style={"width": "150px", "fontSize": "16px", "textAlign": "center"},
                                 ),
                             ]
                         ),
+                        html.Div(
+                            [
+                                html.P(
+                                    "Data As Of:",
+                                    id="label-as-of",
+                                    style={"marginBottom": "2px", "fontWeight": "bold", "textAlign": "center"},
+                                ),
+                                # Options (recorded releases) are filled in by app.refresh_dropdown_options.
+                                dcc.Dropdown(
+                                    id="as-of-dropdown",
+                                    placeholder="Latest Release",
+                                    style={"width": "200px", "fontSize": "16px", "textAlign": "center"},
+                                ),
+                            ]
+                        ),
                         html.Div(
                             [
                                 html.Button(
@@ -0,0 +1,390 @@
+"""
+result_cache.py
+
+In-process cache of computed dashboard results, and the bookkeeping to warm
+it after a restart or a data release.
+
+- ResultCache: bounded LRU of callback results keyed by dataset version and
+  filter combination, so a new release never serves an old answer.
+- FilterPopularity: how often each filter combination is requested. Counts
+  live in a fixed-size Count-Min sketch, and only the heaviest hitters are
+  kept as keys, so memory stays bounded however many combinations users
+  try. Every worker merges its counts into one file on disk, which the
+  next process starts from.
+- CacheWarmer: recomputes the top N combinations into the cache at startup
+  and whenever the dataset version changes.
+- Speculator: computes a result the user is likely to ask for next in one
+  background thread, e.g. while they are still picking filters, whenever no
+  request is being served.
+
+Keys are tuples of str/int/float/None and nested tuples (JSON round-trips
+them as lists, which load() turns back into tuples).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX; concurrent saves may then lose counts
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str, key: tuple):
+        with self._lock:
+            result = self._entries.get((version, key))
+            if result is not None:
+                self._entries.move_to_end((version, key))
+            return result
+
+    def put(self, version: str, key: tuple, result) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(version, key)] = result
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_version(self, version: str) -> None:
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == version]:
+                del self._entries[cache_key]
+
+    def __contains__(self, version_key: tuple) -> bool:
+        with self._lock:
+            return version_key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CountMinSketch:
+    """Approximate counts in depth x width counters; never undercounts."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.int64)
+
+    def _cells(self, key) -> list[int]:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[8 * row:8 * row + 8], "little") % self.width for row in range(self.depth)]
+
+    def add(self, key, count: int = 1) -> int:
+        """Adds count to key and returns its new estimate."""
+        cells = self._cells(key)
+        rows = np.arange(self.depth)
+        self.counts[rows, cells] += count
+        return int(self.counts[rows, cells].min())
+
+    def estimate(self, key) -> int:
+        return int(self.counts[np.arange(self.depth), self._cells(key)].min())
+
+    def halve(self) -> None:
+        self.counts //= 2
+
+
+class FilterPopularity:
+    """
+    Each server process counts its own requests. save() merges them into the
+    shared file instead of overwriting it: under a file lock it adds the
+    counts recorded since this process last saved to the file's, so every
+    worker's traffic ends up in the keys the next process starts from.
+    """
+
+    def __init__(self, max_keys: int = 64, width: int = 2048, depth: int = 4):
+        self.max_keys = max_keys
+        self.sketch = CountMinSketch(width, depth)
+        self._top = {}  # key -> estimated count, at most max_keys entries
+        self._unsaved = {}  # top key -> count recorded since the last save()
+        self._decayed_for = None  # release the counts were last halved for
+        self._lock = threading.Lock()
+
+    def record(self, key: tuple, count: int = 1) -> None:
+        with self._lock:
+            self._record(key, count)
+            if key in self._top:
+                self._unsaved[key] = self._unsaved.get(key, 0) + count
+
+    def _record(self, key: tuple, count: int) -> None:
+        estimate = self.sketch.add(key, count)
+        if key in self._top or len(self._top) < self.max_keys:
+            self._top[key] = estimate
+            return
+        coldest = min(self._top, key=self._top.get)
+        if estimate > self._top[coldest]:
+            del self._top[coldest]
+            self._unsaved.pop(coldest, None)
+            self._top[key] = estimate
+
+    def top(self, n: int) -> list[tuple]:
+        with self._lock:
+            return sorted(self._top, key=self._top.get, reverse=True)[:n]
+
+    def decay(self, release=None) -> None:
+        """
+        Halves every count, so last month's favourites fade once they stop
+        being asked for. With release, the saved file is halved once for it
+        on the next save(), however many processes decay for the same one.
+        """
+        with self._lock:
+            self.sketch.halve()
+            self._top = {key: count // 2 for key, count in self._top.items() if count // 2}
+            self._unsaved = {key: count // 2 for key, count in self._unsaved.items() if count // 2}
+            if release is not None:
+                self._decayed_for = release
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_suffix(path.suffix + ".lock"), "a") as lock_file:
+            _lock_file(lock_file)
+            decayed_for, counts = _read_popularity(path)
+            with self._lock:
+                if self._decayed_for is not None and self._decayed_for != decayed_for:
+                    counts = {key: count // 2 for key, count in counts.items() if count // 2}
+                    decayed_for = self._decayed_for
+                for key, count in self._unsaved.items():
+                    counts[key] = counts.get(key, 0) + count
+                self._unsaved = {}
+            hottest = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.max_keys]
+            payload = {"decayed_for": decayed_for, "entries": [[list(key), count] for key, count in hottest]}
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+    def load(self, path: Path) -> int:
+        """Seeds the counts from a file written by save(). Returns the number of keys loaded."""
+        decayed_for, counts = _read_popularity(path)
+        with self._lock:
+            for key, count in counts.items():
+                self._record(key, count)  # already in the file, so not unsaved
+            self._decayed_for = self._decayed_for or decayed_for
+        return len(counts)
+
+
+def _read_popularity(path: Path) -> tuple:
+    """(release the counts were last halved for, {key: count}) from a save() file."""
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None, {}
+    if isinstance(payload, list):  # written before saves were merged
+        payload = {"decayed_for": None, "entries": payload}
+    return payload.get("decayed_for"), {_as_tuple(key): int(count) for key, count in payload.get("entries", [])}
+
+
+def _lock_file(f) -> None:
+    """Blocks until this process holds an exclusive lock on f (released when f is closed)."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _as_tuple(value):
+    return tuple(_as_tuple(item) for item in value) if isinstance(value, list) else value
+
+
+class CacheWarmer:
+    """
+    Recomputes the most popular results whenever the dataset version changes.
+    cache_key(key) turns a popularity key into the ResultCache key to warm
+    (the same key by default), and compute(cache_key) returns its result
+    against the current release.
+    """
+
+    def __init__(
+        self, cache: ResultCache, popularity: FilterPopularity, compute, get_version, top_n: int, cache_key=None
+    ):
+        self.cache = cache
+        self.popularity = popularity
+        self.compute = compute
+        self.get_version = get_version
+        self.top_n = top_n
+        self.cache_key = cache_key or (lambda key: key)
+        self.warmed_version = None
+        self._thread = None
+
+    def warm(self) -> tuple[int, float]:
+        """Fills the cache for the current version's top keys. Returns (computed, seconds)."""
+        start = time.perf_counter()
+        version = self.get_version()
+        computed = 0
+        failed = 0
+        for key in self.popularity.top(self.top_n):
+            try:
+                key = self.cache_key(key)
+                if (version, key) in self.cache:
+                    continue
+                result = self.compute(key)
+            except Exception:
+                # Usually an MOS the new release no longer has, but a broken
+                # compute fails every key, so say so once per warm.
+                if not failed:
+                    logger.warning("Cache warming failed for %r", key, exc_info=True)
+                failed += 1
+                continue
+            self.cache.put(version, key, result)
+            computed += 1
+        if failed > 1:
+            logger.warning("Cache warming failed for %d of the top %d keys", failed, self.top_n)
+        self.warmed_version = version
+        return computed, time.perf_counter() - start
+
+    def check(self) -> bool:
+        """Warms if the dataset version changed since the last warm. Returns whether it did."""
+        version = self.get_version()
+        if version == self.warmed_version:
+            return False
+        if self.warmed_version is not None:
+            self.cache.discard_version(self.warmed_version)
+            self.popularity.decay(version)
+        self.warm()
+        return True
+
+    def start(self, interval: float, save_path: Path | None = None, save_every: float = 300) -> None:
+        """Runs check() every interval seconds in a daemon thread, saving popularity every save_every."""
+        if self._thread is not None or self.top_n <= 0 or interval <= 0:
+            return
+
+        def loop():
+            last_save = time.monotonic()
+            last_error = None
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check()
+                    if save_path is not None and time.monotonic() - last_save >= save_every:
+                        self.popularity.save(save_path)
+                        last_save = time.monotonic()
+                    last_error = None
+                except Exception as e:
+                    # Keep warming on the next tick; log each new failure once, not every tick.
+                    if repr(e) != last_error:
+                        logger.warning("Cache warmer tick failed", exc_info=True)
+                    last_error = repr(e)
+
+        self._thread = threading.Thread(target=loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+
+class Speculator:
+    """
+    Background precompute into a ResultCache. Only the newest max_pending
+    guesses are kept (a user clicking through dropdowns makes many), and they
+    run one at a time in a single thread.
+
+    The thread shares the GIL with the request threads, so OS priority alone
+    doesn't keep it out of their way. Requests are wrapped in busy(), and a
+    guess only starts while none is in flight in this process. One already
+    running when a request arrives still finishes.
+
+    A request for a key that is being computed should call claim() first,
+    to wait for that result instead of computing it twice.
+
+    compute reads whichever release is current when the guess runs, so a
+    guess submitted under get_version()'s release is dropped if a newer one
+    is loaded before it is stored.
+    """
+
+    def __init__(self, cache: ResultCache, compute, get_version, max_pending: int = 4):
+        self.cache = cache
+        self.compute = compute
+        self.get_version = get_version
+        self._pending = deque(maxlen=max_pending)
+        self._running = {}  # (version, key) -> Event set when it finishes
+        self._in_flight = 0  # requests inside busy()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @contextmanager
+    def busy(self):
+        """Marks a real request in progress; no new guess starts until it ends."""
+        with self._cond:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._cond.notify()
+
+    def submit(self, version: str, key: tuple, **kwargs) -> bool:
+        """Queues compute(*key, **kwargs) unless it is cached or already queued. Returns whether it was queued."""
+        version_key = (version, key)
+        if version_key in self.cache:
+            return False
+        with self._cond:
+            if version_key in self._running or any(item[0] == version_key for item in self._pending):
+                return False
+            self._pending.append((version_key, kwargs, version == self.get_version()))
+            if self._thread is None:
+                # Started on first use, so a preloading server's workers each get their own thread.
+                self._thread = threading.Thread(target=self._loop, name="speculator", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return True
+
+    def claim(self, version: str, key: tuple, timeout: float = 1):
+        """
+        The result for key if a speculative run of it finishes within
+        timeout, else None. A queued run that hasn't started is dropped, as
+        the caller is about to compute it anyway. The timeout stays near the
+        cost of computing it directly (a Load render takes well under a
+        second), so a slow guess doesn't hold a request up.
+        """
+        version_key = (version, key)
+        with self._cond:
+            for item in list(self._pending):
+                if item[0] == version_key:
+                    self._pending.remove(item)
+                    return None
+            done = self._running.get(version_key)
+        if done is None or not done.wait(timeout):
+            return None
+        return self.cache.get(version, key)
+
+    def _loop(self) -> None:
+        try:
+            # Yields the CPU to other processes' threads, e.g. sibling workers.
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)  # this thread only, on Linux
+        except (AttributeError, OSError):
+            pass
+        while True:
+            with self._cond:
+                while not self._pending or self._in_flight:
+                    self._cond.wait()
+                version_key, kwargs, current = self._pending.pop()  # newest guess first
+                done = self._running[version_key] = threading.Event()
+            try:
+                if version_key not in self.cache and self._still_valid(version_key[0], current):
+                    result = self.compute(*version_key[1], **kwargs)
+                    if self._still_valid(version_key[0], current):
+                        self.cache.put(*version_key, result)
+            except Exception:
+                pass  # a guess that fails is simply not cached
+            finally:
+                with self._cond:
+                    del self._running[version_key]
+                done.set()
+
+    def _still_valid(self, version: str, current: bool) -> bool:
+        # A guess for a past release (as_of) reads that release, whatever is current.
+        return not current or version == self.get_version()
@@ -0,0 +1,160 @@
+"""
+backfill.py
+
+Full-archive backfill. Ingests every PDF the index links from --since on
+(default: the whole archive) in resumable batches, oldest month first:
+
+    for each batch of --batch-size links:
+        download it (thread pool, conditional requests as in scrape_pdfs.py)
+        parse the new PDFs (process pool) into the row cache
+        record the batch in data/backfill_state.json
+
+Parsed rows live in the row cache (data/cache/rows), not in memory, so only
+one batch of results is held at a time, and the cache doubles as the
+per-document checkpoint. An interrupted run resumes at the first
+unfinished batch. Once every batch is done the master is rebuilt from the
+cache in a single pass with the same cutoff.
+
+The rebuilt master records its cutoff (data/master/cutoff.json), and later
+monthly or daemon runs keep using it unless CUTOFF_START is set.
+
+Usage
+    python scripts/backfill.py [--since YYYY-MM|none] [--batch-size 50] [--workers N] [--download-workers N] [--restart]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from cleanup_oldtxts import MONTHS, format_cutoff, parse_cutoff
+from ingest import ingest_all, ingest_pdf_file, log_result, lookup_cached_result, store_cached_result
+from pdf_to_txt import DEFAULT_WORKERS, PDF_DIR
+from scrape_pdfs import (
+    BASE_URL,
+    MAX_WORKERS,
+    download_pdf,
+    extract_year_month,
+    get_promotion_pdfs,
+    load_manifest,
+    make_session,
+    save_manifest,
+    select_links,
+)
+
+STATE_FILE = PDF_DIR.parent / "backfill_state.json"
+DEFAULT_BATCH_SIZE = 50
+
+
+def load_backfill_state(since: str, restart: bool = False) -> dict:
+    """The checkpoint for this cutoff; a different cutoff or --restart starts over."""
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        state = None
+    if restart or not state or state.get("since") != since:
+        if state and not restart:
+            print(f"[INFO] Checkpoint is for --since {state.get('since')}, starting over for {since}")
+        state = {"since": since, "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "done": []}
+    return state
+
+
+def save_backfill_state(state: dict) -> None:
+    tmp_file = STATE_FILE.with_suffix(".json.tmp")
+    tmp_file.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp_file, STATE_FILE)
+
+
+def link_month(pdf_url: str) -> tuple[int, int]:
+    """Sort key putting the oldest month first and undated links last."""
+    month, year = extract_year_month(pdf_url.split("/")[-1])
+    return (year, MONTHS.index(month) + 1) if month else (9999, 0)
+
+
+def run_batch(batch: list[str], session, manifest: dict, pool, download_workers: int, cutoff) -> tuple[list[str], dict]:
+    """Downloads and parses one batch. Returns the filenames now in the cache and the download summary."""
+    with ThreadPoolExecutor(max_workers=download_workers) as downloads:
+        statuses = list(downloads.map(lambda url: download_pdf(session, url, manifest), batch))
+    save_manifest(manifest)
+
+    done = []
+    futures = {}
+    for url, status in zip(batch, statuses):
+        path = PDF_DIR / url.split("/")[-1]
+        if not path.exists():
+            continue  # failed download, retried on the next run
+        digest, cached = lookup_cached_result(path, True, cutoff)
+        if cached is None:
+            futures[pool.submit(ingest_pdf_file, path, cutoff)] = (path, digest)
+        else:
+            done.append(path.name)
+
+    for future in as_completed(futures):
+        path, digest = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            raise RuntimeError(f"Failed to ingest {path.name}: {e}") from e
+        store_cached_result(digest, result)
+        log_result(result, "parsed")
+        done.append(path.name)
+
+    return done, {status: statuses.count(status) for status in sorted(set(statuses))}
+
+
+def backfill(
+    base_url: str = BASE_URL,
+    cutoff=None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    download_workers: int = MAX_WORKERS,
+    restart: bool = False,
+):
+    start = time.perf_counter()
+    state = load_backfill_state(format_cutoff(cutoff), restart)
+    manifest = load_manifest()
+    session = make_session(download_workers)
+
+    links = sorted(select_links(get_promotion_pdfs(session, manifest, base_url), cutoff), key=link_month)
+    finished = set(state["done"])
+    pending = [url for url in links if url.split("/")[-1] not in finished]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    print(
+        f"[INFO] Backfilling {len(links)} PDFs since {state['since']}: {len(links) - len(pending)} already done, "
+        f"{len(batches)} batch(es) of up to {batch_size} to go"
+    )
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for n, batch in enumerate(batches, start=1):
+            batch_start = time.perf_counter()
+            done, downloads = run_batch(batch, session, manifest, pool, download_workers, cutoff)
+            state["done"].extend(done)
+            state["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            save_backfill_state(state)
+            print(
+                f"[INFO] Batch {n}/{len(batches)}: {len(done)}/{len(batch)} documents in "
+                f"{time.perf_counter() - batch_start:.1f}s, downloads {downloads}"
+            )
+
+    missing = len(links) - len(set(state["done"]))
+    if missing:
+        print(f"[WARN] {missing} PDFs failed to download; rerun to retry them")
+
+    print("\nRebuilding the master from the row cache")
+    master_df = ingest_all(workers, cutoff=cutoff)
+    print(f"[INFO] Backfill finished in {time.perf_counter() - start:.1f}s")
+    return master_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest the full cutoff-score archive in resumable batches")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--since", default="none", help="First month to keep, YYYY-MM or 'none' for everything")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="PDFs per checkpointed batch")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parse processes")
+    parser.add_argument("--download-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first batch")
+    args = parser.parse_args()
+    backfill(args.base_url, parse_cutoff(args.since), args.batch_size, args.workers, args.download_workers, args.restart)
@@ -0,0 +1,138 @@
+"""
+benchmark_pipeline.py
+
+Offline throughput benchmark for the ingest stages on a synthetic corpus
+(see synthetic_corpus.py). Each stage runs in this process over every
+document, so the numbers are per-core parser throughput:
+
+    pdf_to_txt             full-text extraction (extract_pdf_text)
+    pdf_to_txt_tables      table-only extraction (extract_table_rows)
+    rename_txts            classification (classify_document)
+    cleanup_oldtxts        date cutoff (should_delete)
+    txt_to_csv             table parsing (parse_table_lines)
+    compile_master_dataset typing and validation (clean_and_validate)
+    ingest                 fused PDF bytes -> records (ingest_pdf_bytes)
+
+Usage
+    python scripts/benchmark_pipeline.py [--documents 200] [--seed 0] [--txt-only] [--corpus DIR] [--json OUT]
+
+--txt-only skips the PDF stages, which lets the text stages run on much
+larger corpora.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from cleanup_oldtxts import should_delete
+from compile_master_dataset import clean_and_validate
+from ingest import ingest_pdf_bytes
+from pdf_to_txt import extract_pdf_text, extract_table_rows
+from rename_txts import classify_document
+from synthetic_corpus import generate_corpus
+from txt_to_csv import date_and_component, parse_table_lines, records_to_frame
+
+
+def timed(results: dict, stage: str, documents: int, byte_count: int, fn):
+    start = time.perf_counter()
+    output, rows = fn()
+    seconds = time.perf_counter() - start
+    results[stage] = {
+        "documents": documents,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "docs_per_s": round(documents / seconds, 1) if seconds else None,
+        "rows_per_s": round(rows / seconds, 1) if seconds else None,
+        "mb_per_s": round(byte_count / 2**20 / seconds, 2) if seconds else None,
+    }
+    return output
+
+
+def run_benchmark(corpus_dir: Path, txt_only: bool = False) -> dict:
+    pdf_paths = sorted((corpus_dir / "pdfs").glob("*.pdf"))
+    txt_paths = sorted((corpus_dir / "txt").glob("*.txt"))
+    results = {}
+
+    if not txt_only and pdf_paths:
+        pdf_bytes = sum(p.stat().st_size for p in pdf_paths)
+
+        def full_text():
+            texts = [extract_pdf_text(p)[0] for p in pdf_paths]
+            return texts, 0
+
+        def tables_only():
+            tables = [extract_table_rows(p) for p in pdf_paths]
+            return tables, sum(len(rows) for _, rows, _ in tables)
+
+        def fused():
+            results_ = [ingest_pdf_bytes(p.read_bytes(), p.name) for p in pdf_paths]
+            return results_, sum(len(r["records"]) for r in results_)
+
+        timed(results, "pdf_to_txt", len(pdf_paths), pdf_bytes, full_text)
+        timed(results, "pdf_to_txt_tables", len(pdf_paths), pdf_bytes, tables_only)
+        timed(results, "ingest", len(pdf_paths), pdf_bytes, fused)
+
+    texts = {p.name: p.read_text(encoding="utf-8") for p in txt_paths}
+    text_bytes = sum(len(t) for t in texts.values())
+
+    def classify():
+        decisions = {name: classify_document(name, text) for name, text in texts.items()}
+        return decisions, 0
+
+    decisions = timed(results, "rename_txts", len(texts), text_bytes, classify)
+    # (normalized name, text); repeated months keep their own entry
+    renamed = [(f"{base_name}.txt", texts[name]) for name, (_, base_name, _) in decisions.items() if base_name]
+
+    def cutoff():
+        kept_ = [(name, text) for name, text in renamed if not should_delete(name)]
+        return kept_, 0
+
+    kept = timed(results, "cleanup_oldtxts", len(renamed), 0, cutoff)
+
+    def parse():
+        records = []
+        for name, text in kept:
+            date_str, component = date_and_component(name)
+            records.extend(parse_table_lines(text.splitlines(), date_str, component))
+        return records, len(records)
+
+    records = timed(results, "txt_to_csv", len(kept), sum(len(t) for _, t in kept), parse)
+
+    def compile_master():
+        master_df, _ = clean_and_validate(records_to_frame(records))
+        return master_df, len(master_df)
+
+    timed(results, "compile_master_dataset", len(kept), 0, compile_master)
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(f"{'stage':<24}{'docs':>7}{'rows':>9}{'seconds':>10}{'docs/s':>10}{'rows/s':>12}{'MB/s':>8}")
+    for stage, r in results.items():
+        print(
+            f"{stage:<24}{r['documents']:>7}{r['rows']:>9}{r['seconds']:>10.3f}"
+            f"{r['docs_per_s'] or 0:>10.1f}{r['rows_per_s'] or 0:>12.0f}{r['mb_per_s'] or 0:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest stages on a synthetic corpus")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--txt-only", action="store_true", help="Skip the PDF stages")
+    parser.add_argument("--corpus", type=Path, help="Reuse an existing corpus directory instead of generating one")
+    parser.add_argument("--json", type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus or Path(tmp)
+        if not args.corpus:
+            totals = generate_corpus(corpus_dir, args.documents, args.seed, pdf=not args.txt_only)
+            print(f"Generated {totals['documents']} documents ({totals['rows']} table rows) in {corpus_dir}")
+        results = run_benchmark(corpus_dir, args.txt_only)
+
+    print_results(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
@@ -0,0 +1,37 @@
+"""
+build_database.py
+
+Pipeline stage that runs after compile_master_dataset.py. Writes the master
+into data/master/master_promotion_data.sqlite, indexed on
+(Component, MOS, Date), for deployments that can't hold the whole master in
+memory. Serve from it with DATA_BACKEND=sqlite; the dashboard, API and
+analytics then read only the rows each request needs
+(see data_loader.query_series).
+
+The file is built next to the master and renamed into place, so a running
+dashboard picks up the new release like a new CSV.
+
+Usage
+    python scripts/build_database.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from data_loader import LOCAL_CSV_PATH, LOCAL_DB_PATH, write_database  # noqa: E402
+
+
+def build_database(source: Path = LOCAL_CSV_PATH, path: Path = LOCAL_DB_PATH) -> int:
+    start = time.perf_counter()
+    rows = write_database(source, path)
+    size_mb = path.stat().st_size / (1024 * 1024)
+    print(f"[INFO] Wrote {rows} rows to {path} ({size_mb:.1f} MB) in {time.perf_counter() - start:.2f}s")
+    return rows
+
+
+if __name__ == "__main__":
+    build_database()
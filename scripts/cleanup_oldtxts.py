@@ -1,27 +1,96 @@
+import argparse
+import json
 import os
 import re
+from pathlib import Path
 
 TXT_DIR = "../data/txt/"
-CUTOFF_YEAR = 2023
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
 
-def should_delete(filename):
+
+def parse_cutoff(value):
+    """
+    Parses the first month to keep, "YYYY-MM" (e.g. "2023-08"), into
+    (year, month number). "none", "all" or "" mean no cutoff (full archive)
+    and return None.
+    """
+    if value is None or value.strip().lower() in ("", "none", "all"):
+        return None
+    match = re.fullmatch(r"(\d{4})-(\d{1,2})", value.strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"Cutoff must look like YYYY-MM or 'none', got {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def format_cutoff(cutoff):
+    """Inverse of parse_cutoff."""
+    return "none" if cutoff is None else f"{cutoff[0]}-{cutoff[1]:02d}"
+
+
+# The cutoff the current master was built with, written on every ingest.
+# Runs that don't set CUTOFF_START keep it, so the monthly pipeline doesn't
+# quietly drop the history a backfill (--since none) added.
+CUTOFF_FILE = Path(__file__).resolve().parents[1] / "data" / "master" / "cutoff.json"
+FALLBACK_CUTOFF = "2023-08"
+
+
+def cutoff_setting():
+    """CUTOFF_START if set, else the cutoff recorded with the master, else 2023-08."""
+    value = os.environ.get("CUTOFF_START")
+    if value is not None:
+        return value
+    try:
+        return json.loads(CUTOFF_FILE.read_text(encoding="utf-8"))["cutoff"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return FALLBACK_CUTOFF
+
+
+def current_cutoff():
+    """parse_cutoff(cutoff_setting()), read now rather than at import."""
+    return parse_cutoff(cutoff_setting())
+
+
+def record_cutoff(cutoff):
+    """Records the cutoff a freshly written master was built with."""
+    CUTOFF_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = CUTOFF_FILE.with_suffix(".json.tmp")
+    tmp_file.write_text(json.dumps({"cutoff": format_cutoff(cutoff)}) + "\n", encoding="utf-8")
+    os.replace(tmp_file, CUTOFF_FILE)
+
+
+# First month kept by the scraper and every ingest path. Set CUTOFF_START=none
+# to keep the full archive (see backfill.py).
+DEFAULT_CUTOFF = current_cutoff()
+
+
+def before_cutoff(year, month, cutoff=DEFAULT_CUTOFF):
+    """
+    True when year (2 or 4 digits) and month ("AUG") fall before cutoff. An
+    unrecognised month only passes in a year after the cutoff's.
+    """
+    if cutoff is None:
+        return False
+    year = int(year)
+    if year < 100:
+        year += 2000
+    month = month.upper()
+    return (year, MONTHS.index(month) + 1 if month in MONTHS else 0) < cutoff
+
+
+def should_delete(filename, cutoff=DEFAULT_CUTOFF):
     match = re.match(r"(ACTIVE|RESERVE)_(\w{3})_(\d{2}|\d{4})\.txt$", filename)
     if match:
         _, month, year = match.groups()
-        year = int(year)
-        if year < 100:
-            year += 2000
-        allowed_months = ["AUG", "SEP", "OCT", "NOV", "DEC"]
-        if year < CUTOFF_YEAR or (year == CUTOFF_YEAR and month not in allowed_months):
+        if before_cutoff(year, month, cutoff):
             return True
     return False
 
 
 
-def cleanup_old_txts():
+def cleanup_old_txts(cutoff=DEFAULT_CUTOFF):
     deleted_files = []
     for filename in os.listdir(TXT_DIR):
-        if filename.endswith('.txt') and should_delete(filename):
+        if filename.endswith('.txt') and should_delete(filename, cutoff):
             file_path = os.path.join(TXT_DIR, filename)
             os.remove(file_path)
             deleted_files.append(filename)
@@ -32,7 +101,10 @@ def cleanup_old_txts():
         log.write("\n".join(deleted_files))
 
 if __name__ == "__main__":
-    cleanup_old_txts()
+    parser = argparse.ArgumentParser(description="Delete .txt files dated before the cutoff month")
+    parser.add_argument("--cutoff", default=None, help="First month to keep, YYYY-MM or 'none' (default: CUTOFF_START, else the master's recorded cutoff)")
+    args = parser.parse_args()
+    cleanup_old_txts(DEFAULT_CUTOFF if args.cutoff is None else parse_cutoff(args.cutoff))
 
 
 
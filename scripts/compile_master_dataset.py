@@ -1,4 +1,7 @@
+import hashlib
+import json
 import os
+import shutil
 import pandas as pd
 from pathlib import Path
 
@@ -10,6 +13,140 @@ MASTER_DIR.mkdir(parents=True, exist_ok=True)
 
 # Master dataset output path
 MASTER_FILE = MASTER_DIR / "master_promotion_data.csv"
+# Rows that failed validation, with the reason, for manual review
+QUARANTINE_FILE = MASTER_DIR / "quarantined_rows.csv"
+# The master split by component and year, see write_partitions
+PARTITIONS_DIR = MASTER_DIR / "partitions"
+
+RANKS = ("SGT", "SSG")
+NUMERIC_COLUMNS = [f"{kind}_{rank}" for kind in ("Cutoff", "Eligibles", "Promotions") for rank in RANKS]
+CUTOFF_MIN, CUTOFF_MAX = 24, 798  # valid promotion point range
+KEY_COLUMNS = ["Date", "Component", "MOS"]
+
+
+def clean_numeric_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Casts every count/cutoff column to float64. Text cells have everything
+    but digits, "." and "-" stripped first (e.g. "1,204" -> 1204).
+
+    Returns the cleaned frame and a per-row reason string naming the columns
+    whose non-empty values still couldn't be parsed.
+    """
+    df = df.copy()
+    reasons = pd.Series("", index=df.index)
+    for column in NUMERIC_COLUMNS:
+        raw = df[column]
+        if raw.dtype == object:
+            text = raw.astype("string").str.replace(r"[^\d\.\-]", "", regex=True)
+            cleaned = pd.to_numeric(text.replace("", pd.NA), errors="coerce")
+            unparsed = raw.notna() & (raw.astype("string") != "N/A") & cleaned.isna()
+            reasons = reasons.where(~unparsed, reasons + f"non-numeric {column}; ")
+            raw = cleaned
+        df[column] = raw.astype("float64")
+    return df, reasons
+
+
+def validate_rows(df: pd.DataFrame) -> pd.Series:
+    """Per-row reason string for rows breaking a range or consistency rule ("" when valid)."""
+    reasons = pd.Series("", index=df.index)
+    # txt_to_csv tags rows from a file it couldn't date as UNKNOWN
+    undated = df["Date"].isna() | (df["Date"] == "UNKNOWN")
+    reasons = reasons.where(~undated, reasons + "no Date; ")
+    for rank in RANKS:
+        cutoff = df[f"Cutoff_{rank}"]
+        out_of_range = cutoff.notna() & ((cutoff < CUTOFF_MIN) | (cutoff > CUTOFF_MAX))
+        reasons = reasons.where(~out_of_range, reasons + f"Cutoff_{rank} outside {CUTOFF_MIN}-{CUTOFF_MAX}; ")
+
+        over_promoted = df[f"Promotions_{rank}"] > df[f"Eligibles_{rank}"]  # False when either is NaN
+        reasons = reasons.where(~over_promoted, reasons + f"Promotions_{rank} > Eligibles_{rank}; ")
+    return reasons
+
+
+def clean_and_validate(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Returns (clean_df, quarantined_df). The quarantined frame holds the
+    rejected rows with their original values and a Reason column.
+    """
+    cleaned, reasons = clean_numeric_columns(df)
+    reasons = (reasons + validate_rows(cleaned)).str.rstrip("; ")
+    bad = reasons != ""
+
+    quarantined = df[bad].assign(Reason=reasons[bad])
+    return cleaned[~bad].reset_index(drop=True), quarantined.reset_index(drop=True)
+
+
+def drop_duplicate_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drops rows repeated exactly (e.g. the same table extracted from two
+    copies of a memo), keeping the first. Rows that share a Date, Component
+    and MOS but disagree are kept, with a warning, since there is no telling
+    which document is right.
+    """
+    deduped = df.drop_duplicates(ignore_index=True)
+    if len(deduped) < len(df):
+        print(f"[INFO] Dropped {len(df) - len(deduped)} duplicate rows")
+    conflicts = deduped.duplicated(KEY_COLUMNS, keep=False)
+    if conflicts.any():
+        keys = deduped.loc[conflicts, KEY_COLUMNS].drop_duplicates()
+        print(f"[WARN] {len(keys)} Date/Component/MOS keys have conflicting rows, e.g. {keys.iloc[0].tolist()}")
+    return deduped
+
+
+def write_quarantine_report(quarantined: pd.DataFrame, report_file: Path = QUARANTINE_FILE) -> None:
+    quarantined.to_csv(report_file, index=False)
+    if len(quarantined):
+        print(f"[WARN] Quarantined {len(quarantined)} rows, see {report_file}")
+
+
+def write_partitions(master_df: pd.DataFrame, master_file: Path = MASTER_FILE, partitions_dir: Path = PARTITIONS_DIR) -> int:
+    """
+    Writes master_df, as just saved to master_file, split by component and
+    year into partitions/<dataset version>/<COMPONENT>/<YEAR>.csv (rows
+    without a date go to undated.csv), then swaps index.json over to the new
+    set. data_loader.load_master_df reads only the partitions a filter needs.
+
+    The index records the size and mtime of master_file, and loaders ignore
+    partitions that don't match the master on disk. The previous set is kept
+    for readers that are mid-load. Returns the number of partitions.
+    """
+    version = hashlib.sha256(master_file.read_bytes()).hexdigest()[:16]
+    stat = master_file.stat()
+    index_file = partitions_dir / "index.json"
+    try:
+        previous = json.loads(index_file.read_text(encoding="utf-8"))["dataset_version"]
+    except (OSError, ValueError, KeyError):
+        previous = None
+
+    version_dir = partitions_dir / version
+    if version_dir.exists():
+        shutil.rmtree(version_dir)
+    components = master_df["Component"].fillna("UNKNOWN").astype(str).str.upper()
+    years = pd.to_datetime(master_df["Date"], format="%Y-%b", errors="coerce").dt.year.fillna(0).astype(int)
+
+    entries = []
+    for (component, year), part in master_df.groupby([components, years], sort=True):
+        year = int(year)
+        name = f"{year}.csv" if year else "undated.csv"
+        path = version_dir / component / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part.to_csv(path, index=False)
+        entries.append({"component": component, "year": year or None, "path": f"{version}/{component}/{name}", "rows": len(part)})
+
+    index = {
+        "dataset_version": version,
+        "master": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "columns": list(master_df.columns),
+        "partitions": entries,
+    }
+    tmp_file = index_file.with_suffix(".json.tmp")
+    tmp_file.write_text(json.dumps(index, indent=2), encoding="utf-8")
+    os.replace(tmp_file, index_file)
+
+    for old_dir in partitions_dir.iterdir():
+        if old_dir.is_dir() and old_dir.name not in (version, previous):
+            shutil.rmtree(old_dir)
+    return len(entries)
+
 
 def compile_all_csvs():
     all_data = []
@@ -22,11 +159,14 @@ def compile_all_csvs():
 
     if all_data:
         # Combine all datasets into one
-        master_df = pd.concat(all_data, ignore_index=True)
+        master_df, quarantined = clean_and_validate(pd.concat(all_data, ignore_index=True))
+        master_df = drop_duplicate_rows(master_df)
 
         # Save as master CSV
         master_df.to_csv(MASTER_FILE, index=False)
+        write_partitions(master_df)
+        write_quarantine_report(quarantined)
         print(f"Compiled all CSVs into {MASTER_FILE}")
 
 if __name__ == "__main__":
-    compile_all_csvs()
\ No newline at end of file
+    compile_all_csvs()
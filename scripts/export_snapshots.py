@@ -0,0 +1,90 @@
+"""
+export_snapshots.py
+
+Pipeline stage that runs after compile_master_dataset.py. Pre-renders every
+(Component, MOS, rank) series over its full history into a compact JSON file
+under data/snapshots/<COMPONENT>/<MOS>_<RANK>.json, plus an index.json listing
+them with the dataset version they belong to.
+
+The files can be served from disk or a CDN (/api/snapshot on the dashboard
+server), and the dashboard uses them instead of re-rendering the static
+figures when a request covers a series' whole history.
+
+The new set is written to a temporary directory and swapped in at the end, so
+a running dashboard never sees a half-written export.
+"""
+
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from data_loader import get_dataset_version, get_series_index, refresh_if_changed  # noqa: E402
+from dashboard_scripts.snapshots import SNAPSHOT_DIR, build_snapshot, snapshot_path  # noqa: E402
+
+RANKS = ("SGT", "SSG")
+
+
+def write_json(path: Path, payload: dict) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(payload, separators=(",", ":"), allow_nan=False)
+    path.write_text(data, encoding="utf-8")
+    return len(data)
+
+
+def export_snapshots(output_dir: Path = SNAPSHOT_DIR) -> int:
+    start = time.perf_counter()
+    refresh_if_changed(force=True)  # a long-running caller (ingest_daemon) may hold an older master
+    dataset_version = get_dataset_version()
+    staging_dir = output_dir.with_name(output_dir.name + ".tmp")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+
+    entries = []
+    total_bytes = 0
+    for (component, mos), series_df in sorted(get_series_index().items()):
+        if component not in ("ACTIVE", "RESERVE"):
+            continue
+        for rank in RANKS:
+            if series_df[f"Cutoff_{rank}"].notna().sum() == 0:
+                continue
+            snapshot = build_snapshot(series_df, component, mos, rank, dataset_version)
+            path = snapshot_path(component, mos, rank, staging_dir)
+            total_bytes += write_json(path, snapshot)
+            entries.append(
+                {
+                    "component": component,
+                    "mos": mos,
+                    "rank": rank,
+                    "path": path.relative_to(staging_dir).as_posix(),
+                    "start": snapshot["start"],
+                    "end": snapshot["end"],
+                }
+            )
+
+    write_json(staging_dir / "index.json", {"dataset_version": dataset_version, "series": entries})
+
+    # Swap the fresh export in place of the old one.
+    old_dir = output_dir.with_name(output_dir.name + ".old")
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    if output_dir.exists():
+        output_dir.rename(old_dir)
+    staging_dir.rename(output_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Exported {len(entries)} snapshots ({total_bytes / 1024:.0f} KB) "
+        f"for dataset {dataset_version} to {output_dir} in {elapsed:.1f}s"
+    )
+    return len(entries)
+
+
+if __name__ == "__main__":
+    export_snapshots()
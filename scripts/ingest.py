@@ -0,0 +1,354 @@
+"""
+ingest.py
+
+In-process ingest: PDF bytes -> classification -> table rows -> master dataset.
+
+Does the work of pdf_to_txt.py, rename_txts.py, cleanup_oldtxts.py,
+txt_to_csv.py and compile_master_dataset.py in one interpreter without
+writing anything between stages. The same classification, date cutoff and
+row rules are reused from those scripts. Intermediate .txt/.csv files are
+only written with --keep-intermediates, for debugging.
+
+Each document's result is cached under data/cache/rows keyed by the PDF's
+sha256, in a directory per version of the parsing code, so a rerun only
+parses PDFs that are new or changed and rebuilds the master from the cached
+rows. A PDF byte-identical to another is never parsed, and a document whose
+table matches an earlier one's (in filename order) contributes no rows.
+
+Usage
+    python scripts/ingest.py [--workers N] [--keep-intermediates] [--no-cache] [--since YYYY-MM|none]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from cleanup_oldtxts import DEFAULT_CUTOFF, parse_cutoff, record_cutoff, should_delete
+from compile_master_dataset import (
+    MASTER_FILE,
+    clean_and_validate,
+    drop_duplicate_rows,
+    write_partitions,
+    write_quarantine_report,
+)
+from pdf_to_txt import (
+    DEFAULT_WORKERS,
+    PDF_DIR,
+    TABLE_HEADER,
+    TXT_DIR,
+    code_digest,
+    extract_pdf_text,
+    extract_table_rows,
+    screen_text,
+)
+from rename_txts import classify_document, generate_unique_filename
+from txt_to_csv import COLUMNS, CSV_DIR
+
+ROW_CACHE_DIR = PDF_DIR.parent / "cache" / "rows"
+# Named after the code that produces the rows, see pdf_to_txt.code_digest.
+ROW_CACHE_KEY = code_digest("pdf_to_txt.py", "rename_txts.py", "cleanup_oldtxts.py", "txt_to_csv.py", "ingest.py")
+
+
+def ingest_pdf_bytes(data: bytes, filename: str, cutoff=DEFAULT_CUTOFF) -> dict:
+    """
+    Ingests one PDF held in memory.
+
+    Only the memo header and cutoff table are extracted. If the header alone
+    can't classify the document, the full text is extracted and classified
+    the way rename_txts.py would.
+
+    Returns a dict with filename, status ("ok" or the skip reason),
+    base_name, text (the txt_to_csv-style layout, for --keep-intermediates),
+    records (a list of row lists in COLUMNS order) and the bytes and pages
+    read. Documents dated before cutoff (see cleanup_oldtxts.parse_cutoff)
+    are skipped.
+    """
+    # Stop after the first page when its header already rules the document out.
+    preamble, rows, pages = extract_table_rows(
+        io.BytesIO(data), screen=lambda lines: screen_text(filename, "\n".join(lines), cutoff)[0]
+    )
+    text = "\n".join(preamble)
+    component, base_name, reason = classify_document(filename, text)
+
+    if base_name is None and reason != "non-series document":
+        full_text, full_pages = extract_pdf_text(io.BytesIO(data))
+        pages += full_pages
+        component, base_name, reason = classify_document(filename, full_text)
+
+    result = {
+        "filename": filename,
+        "status": reason,
+        "base_name": base_name,
+        "text": "",
+        "records": [],
+        "bytes": len(data),
+        "pages": pages,
+    }
+    if base_name is None:
+        return result
+
+    if should_delete(f"{base_name}.txt", cutoff):
+        result["status"] = "before cutoff date"
+        return result
+
+    _, month, year = base_name.split("_")
+    date_str = f"20{year}-{month}"
+    result["text"] = "\n".join(preamble + [TABLE_HEADER] + [" ".join(row) for row in rows] + ["TOTALS"])
+    result["records"] = [
+        [date_str, component] + [pd.NA if v == "N/A" else v for v in row]
+        for row in rows
+    ]
+    return result
+
+
+def ingest_pdf_file(pdf_path: Path, cutoff=DEFAULT_CUTOFF) -> dict:
+    start = time.perf_counter()
+    result = ingest_pdf_bytes(Path(pdf_path).read_bytes(), Path(pdf_path).name, cutoff)
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def row_cache_path(digest: str) -> Path:
+    return ROW_CACHE_DIR / ROW_CACHE_KEY / digest[:2] / f"{digest}.json"
+
+
+def load_cached_result(digest: str, filename: str) -> dict | None:
+    try:
+        result = json.loads(row_cache_path(digest).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    # Classification can fall back to the filename, so the name is part of the key.
+    return result if result.get("filename") == filename else None
+
+
+def store_cached_result(digest: str, result: dict) -> None:
+    path = row_cache_path(digest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    records = [[None if v is pd.NA else v for v in record] for record in result["records"]]
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps({**result, "records": records}), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def records_to_frame(records: list[list]) -> pd.DataFrame:
+    # Raw cell text; compile_master_dataset.clean_and_validate types and checks it.
+    return pd.DataFrame(records, columns=COLUMNS)
+
+
+def write_intermediates(result: dict) -> None:
+    txt_name = generate_unique_filename(TXT_DIR, result["base_name"])
+    (TXT_DIR / txt_name).write_text(result["text"], encoding="utf-8")
+    records_to_frame(result["records"]).to_csv(CSV_DIR / txt_name.replace(".txt", ".csv"), index=False)
+
+
+def write_master(master_df: pd.DataFrame, master_file: Path = MASTER_FILE) -> None:
+    # Write next to the target and rename so readers never see a partial file.
+    tmp_file = master_file.with_suffix(".csv.tmp")
+    master_df.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, master_file)
+    write_partitions(master_df, master_file, master_file.parent / "partitions")
+
+
+def file_stats(result: dict, cached: bool) -> dict:
+    """Per-file numbers for the pipeline profile."""
+    return {
+        "file": result["filename"],
+        "status": result["status"],
+        "cached": cached,
+        "seconds": 0.0 if cached else result.get("seconds", 0.0),
+        "bytes_read": result.get("bytes", 0),
+        "pages": 0 if cached else result.get("pages", 0),
+        "rows": len(result["records"]),
+    }
+
+
+def ingest_all(
+    workers: int = DEFAULT_WORKERS,
+    keep_intermediates: bool = False,
+    use_cache: bool = True,
+    stats: dict | None = None,
+    cutoff=DEFAULT_CUTOFF,
+) -> pd.DataFrame:
+    """
+    Ingests data/pdfs into the master. If stats is a dict it is filled with
+    per-file numbers ("files") and totals for the pipeline profile.
+    """
+    pdf_files = sorted(f for f in PDF_DIR.iterdir() if f.is_file() and f.suffix.lower() == ".pdf")
+    total = len(pdf_files)
+    run_start = time.perf_counter()
+
+    results = []
+    file_rows = []
+    pending = {}
+    by_digest = {}
+    seen_digests = set()
+    duplicates = []
+    for path in pdf_files:
+        digest, cached = lookup_cached_result(path, use_cache, cutoff)
+        if digest in seen_digests:
+            duplicates.append((path, digest))
+            continue
+        seen_digests.add(digest)
+        if cached is None:
+            pending[path] = digest
+        else:
+            by_digest[digest] = cached
+            results.append(cached)
+            file_rows.append(file_stats(cached, cached=True))
+
+    workers = max(1, min(workers, len(pending) or 1))
+    print(
+        f"Ingesting {total} PDFs ({len(results)} cached, {len(duplicates)} identical to another, "
+        f"{len(pending)} to parse) with {workers} worker(s)"
+    )
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ingest_pdf_file, path, cutoff): path for path in pending}
+            for i, future in enumerate(as_completed(futures), start=1):
+                name = futures[future].name
+                try:
+                    result = future.result()
+                except Exception as e:
+                    raise RuntimeError(f"Failed to ingest {name}: {e}") from e
+                by_digest[pending[futures[future]]] = result
+                results.append(result)
+                file_rows.append(file_stats(result, cached=False))
+                if use_cache:
+                    store_cached_result(pending[futures[future]], result)
+                log_result(result, f"{i}/{len(pending)}")
+
+    for path, digest in duplicates:
+        result = copy_result(by_digest[digest], path.name)
+        results.append(result)
+        file_rows.append(file_stats(result, cached=True))
+
+    return finish_ingest(results, file_rows, len(pending), run_start, cutoff, keep_intermediates, stats)
+
+
+def lookup_cached_result(path: Path, use_cache: bool = True, cutoff=DEFAULT_CUTOFF) -> tuple[str, dict | None]:
+    """Returns the PDF's sha256 and its cached result (None on a miss or with use_cache off)."""
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    cached = load_cached_result(digest, path.name) if use_cache else None
+    return digest, None if cached is None else recheck_cutoff(cached, cutoff)
+
+
+def recheck_cutoff(result: dict, cutoff) -> dict | None:
+    """
+    Re-applies the date cutoff to a cached result, which may have been
+    stored under a different one. Returns None when a document skipped for
+    its date is now in range, as it was never parsed and needs to be.
+    """
+    if not result["base_name"]:
+        return result
+    too_old = should_delete(f"{result['base_name']}.txt", cutoff)
+    if result["status"] == "before cutoff date":
+        return result if too_old else None
+    if result["status"] == "ok" and too_old:
+        return {**result, "status": "before cutoff date", "text": "", "records": []}
+    return result
+
+
+def copy_result(result: dict, filename: str) -> dict:
+    """The result of a byte-identical PDF under another name, without parsing it again."""
+    return {**result, "filename": filename, "seconds": 0.0}
+
+
+def table_key(records: list[list]) -> str:
+    return hashlib.sha256(json.dumps([[None if v is pd.NA else v for v in r] for r in records]).encode()).hexdigest()
+
+
+def dedupe_documents(results: list[dict]) -> int:
+    """
+    Marks every kept document whose table rows match an earlier result's as
+    "duplicate of <filename>", so a memo downloaded twice, or re-issued with
+    different bytes but the same table, contributes its rows once. results
+    must already be in a stable order. Returns how many were marked.
+    """
+    first_by_table = {}
+    marked = 0
+    for result in results:
+        if result["status"] != "ok" or not result["records"]:
+            continue
+        first = first_by_table.setdefault(table_key(result["records"]), result["filename"])
+        if first != result["filename"]:
+            result["status"] = f"duplicate of {first}"
+            marked += 1
+    return marked
+
+
+def log_result(result: dict, progress: str) -> None:
+    name = result["filename"]
+    if result["status"] == "ok":
+        print(f"[INGESTED] {name} -> {result['base_name']} ({len(result['records'])} rows) | {progress}")
+    else:
+        print(f"[SKIP] {name}: {result['status']} | {progress}")
+
+
+def finish_ingest(
+    results: list[dict],
+    file_rows: list[dict],
+    parsed: int,
+    run_start: float,
+    cutoff,
+    keep_intermediates: bool = False,
+    stats: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Drops duplicate documents, validates the kept documents' rows, writes the
+    master, records the cutoff it was built with and fills stats.
+    """
+    results.sort(key=lambda r: r["filename"])
+    duplicates = dedupe_documents(results)
+    if duplicates:
+        status = {r["filename"]: r["status"] for r in results}
+        for row in file_rows:
+            row["status"] = status[row["file"]]
+        print(f"[INFO] Skipped {duplicates} documents whose table duplicates another's")
+    kept = [r for r in results if r["status"] == "ok"]
+    if keep_intermediates:
+        for result in kept:
+            write_intermediates(result)
+
+    master_df, quarantined = clean_and_validate(records_to_frame([record for r in kept for record in r["records"]]))
+    master_df = drop_duplicate_rows(master_df)
+    write_master(master_df)
+    record_cutoff(cutoff)
+    write_quarantine_report(quarantined)
+
+    if stats is not None:
+        stats["files"] = sorted(file_rows, key=lambda f: f["file"])
+        stats["documents"] = len(results)
+        stats["duplicate_documents"] = duplicates
+        stats["parsed"] = parsed
+        stats["pages"] = sum(f["pages"] for f in file_rows)
+        stats["rows"] = len(master_df)
+        stats["quarantined_rows"] = len(quarantined)
+
+    elapsed = time.perf_counter() - run_start
+    print(f"Wrote {len(master_df)} rows from {len(kept)}/{len(results)} documents to {MASTER_FILE} in {elapsed:.2f}s")
+    return master_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest data/pdfs straight into the master dataset")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--keep-intermediates",
+        action="store_true",
+        help="Also write the per-document .txt and .csv files to data/txt and data/csv",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every PDF instead of using data/cache/rows")
+    parser.add_argument(
+        "--since", default=None, help="First month to keep, YYYY-MM or 'none' for everything (default: CUTOFF_START, else the master's recorded cutoff)"
+    )
+    args = parser.parse_args()
+    cutoff = DEFAULT_CUTOFF if args.since is None else parse_cutoff(args.since)
+    ingest_all(args.workers, args.keep_intermediates, use_cache=not args.no_cache, cutoff=cutoff)
@@ -0,0 +1,125 @@
+"""
+ingest_daemon.py
+
+Long-running ingest service, so a new month's cutoffs reach the dashboard
+without anyone running run_monthly_pipeline.py by hand.
+
+- Polls data/pdfs every --poll seconds for PDFs that were added, replaced or
+  removed. A change is acted on once the directory looks the same on the
+  next poll, so a file that is still being copied isn't ingested half
+  written.
+- With --scrape-every MINUTES, also runs the scraper on that schedule.
+- One cycle runs at startup to catch up on anything that arrived while the
+  daemon was down.
+
+Each trigger runs the incremental pipeline (pipeline_dag.run_pipeline):
+only new or changed PDFs are parsed, the rest of the master is rebuilt from
+the row cache, and the master is published with an atomic rename. A
+running dashboard notices the new file within DATA_RELOAD_SECONDS and
+swaps it in (see data_loader.refresh_if_changed).
+
+A failed cycle is logged and retried on the next trigger. SIGTERM/SIGINT
+stop the daemon between cycles.
+
+Usage
+    python scripts/ingest_daemon.py [--poll 30] [--scrape-every MINUTES] [--stream] [--once]
+"""
+
+import argparse
+import signal
+import threading
+import time
+from datetime import datetime
+
+from pipeline_dag import PDFS_DIR, pdf_files, run_pipeline
+
+DEFAULT_POLL_SECONDS = 30
+
+
+def pdf_signature() -> dict:
+    """{filename: (size, mtime_ns)} for every PDF in data/pdfs."""
+    signature = {}
+    for path in pdf_files():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue  # removed between listing and stat
+        signature[path.name] = (stat.st_size, stat.st_mtime_ns)
+    return signature
+
+
+def describe_changes(old: dict, new: dict) -> str:
+    added = len(new.keys() - old.keys())
+    removed = len(old.keys() - new.keys())
+    changed = sum(1 for name in new.keys() & old.keys() if new[name] != old[name])
+    return f"{added} added, {changed} changed, {removed} removed"
+
+
+def log(message: str) -> None:
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] {message}", flush=True)
+
+
+def run_cycle(scrape: bool, stream: bool = False) -> bool:
+    """One incremental pipeline run; the scrape stage only runs when scrape is set."""
+    options = {"stream": stream and scrape, "skip": () if scrape else ("scrape_pdfs",)}
+    try:
+        run_pipeline(options)
+    except Exception as e:
+        log(f"[ERROR] Pipeline cycle failed, retrying on the next trigger: {e}")
+        return False
+    log("[INFO] Pipeline cycle finished")
+    return True
+
+
+def run_daemon(
+    poll_seconds: float = DEFAULT_POLL_SECONDS,
+    scrape_every_minutes: float | None = None,
+    stream: bool = False,
+    once: bool = False,
+) -> None:
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    scrape_interval = scrape_every_minutes * 60 if scrape_every_minutes else None
+    log(
+        f"[INFO] Watching {PDFS_DIR} every {poll_seconds:g}s"
+        + (f", scraping every {scrape_every_minutes:g} min" if scrape_interval else "")
+    )
+
+    # Signatures are taken before each cycle, so files arriving mid-cycle
+    # still count as changes afterwards.
+    published = pdf_signature()
+    run_cycle(scrape=scrape_interval is not None, stream=stream)
+    next_scrape = time.monotonic() + scrape_interval if scrape_interval else None
+    settling = None
+
+    while not once and not stop.wait(poll_seconds):
+        current = pdf_signature()
+        scrape_due = next_scrape is not None and time.monotonic() >= next_scrape
+
+        if scrape_due:
+            log("[INFO] Scheduled scrape")
+            published = current
+            run_cycle(scrape=True, stream=stream)
+            next_scrape = time.monotonic() + scrape_interval
+            settling = None
+        elif current != published and current == settling:
+            log(f"[INFO] data/pdfs changed ({describe_changes(published, current)})")
+            published = current
+            run_cycle(scrape=False)
+            settling = None
+        else:
+            settling = current if current != published else None
+
+    log("[INFO] Stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the master dataset up to date as new PDFs arrive")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS, help="Seconds between data/pdfs checks")
+    parser.add_argument("--scrape-every", type=float, metavar="MINUTES", help="Also run the scraper on this schedule")
+    parser.add_argument("--stream", action="store_true", help="Parse PDFs while a scheduled scrape downloads them")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit (e.g. from cron)")
+    args = parser.parse_args()
+    run_daemon(args.poll, args.scrape_every, args.stream, args.once)
@@ -0,0 +1,106 @@
+"""
+load_test.py
+
+Fires the main dashboard callback (the one behind the Load Data button) at a
+running server from several threads and reports throughput and latency.
+
+Usage
+    gunicorn -c gunicorn.conf.py wsgi:server        # in another shell
+    python scripts/load_test.py --url http://127.0.0.1:8050 --requests 500 --concurrency 16
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+MAIN_OUTPUT_ID = "promotion-graph.figure"
+
+DEFAULT_VALUES = {
+    "load-button.n_clicks": 1,
+    "ci-level-dropdown.value": 95,
+    "user-points.value": 450,
+    "trendline-checkbox.value": [],
+    "volatility-checkbox.value": [],
+    "toggle-probability.value": ["show"],
+    "date-range-start.value": "Aug-2023",
+    "date-range-end.value": "Dec-2025",
+    "component-dropdown.value": "Active",
+    "rank-dropdown.value": "SGT",
+}
+
+MOS_SAMPLE = ["11B", "11C", "12B", "13F", "25B", "31B", "35F", "42A", "68W", "88M", "92Y"]
+
+
+def find_main_callback(base_url: str, session: requests.Session) -> dict:
+    deps = session.get(f"{base_url}/_dash-dependencies", timeout=30).json()
+    for dep in deps:
+        if MAIN_OUTPUT_ID in dep["output"]:
+            return dep
+    raise RuntimeError(f"No callback with output {MAIN_OUTPUT_ID} found at {base_url}")
+
+
+def build_payload(dep: dict, mos: str) -> dict:
+    def prop(item):
+        key = f"{item['id']}.{item['property']}"
+        value = mos if item["id"] == "mos-dropdown" else DEFAULT_VALUES.get(key)
+        return {"id": item["id"], "property": item["property"], "value": value}
+
+    outputs = [
+        {"id": o.split(".")[0], "property": o.split(".")[1]}
+        for o in dep["output"].strip(".").split("...")
+    ]
+    return {
+        "output": dep["output"],
+        "outputs": outputs,
+        "inputs": [prop(i) for i in dep["inputs"]],
+        "state": [prop(s) for s in dep["state"]],
+        "changedPropIds": ["load-button.n_clicks"],
+    }
+
+
+def run(base_url: str, total: int, concurrency: int) -> None:
+    base_url = base_url.rstrip("/")
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    dep = find_main_callback(base_url, session)
+    headers = {"Accept-Encoding": "gzip, br", "Content-Type": "application/json"}
+
+    def one_request(_):
+        payload = build_payload(dep, random.choice(MOS_SAMPLE))
+        start = time.perf_counter()
+        response = session.post(f"{base_url}/_dash-update-component", json=payload, headers=headers, timeout=60)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code, int(response.headers.get("Content-Length", 0))
+
+    print(f"Sending {total} requests to {base_url} with concurrency {concurrency}")
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for r in results if r[1] != 200)
+    wire_bytes = statistics.mean(r[2] for r in results)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    print(f"Throughput: {total / wall:.1f} req/s over {wall:.2f}s")
+    print(f"Latency ms: p50={pct(50):.1f} p90={pct(90):.1f} p99={pct(99):.1f} max={latencies[-1]:.1f}")
+    print(f"Errors: {errors}  Mean response size on the wire: {wire_bytes / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8050")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    run(args.url, args.requests, args.concurrency)
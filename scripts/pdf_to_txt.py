@@ -1,6 +1,16 @@
+import argparse
+import hashlib
+import json
 import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import pdfplumber
+import psutil
+
+from cleanup_oldtxts import DEFAULT_CUTOFF, should_delete
+from rename_txts import classify_document, should_skip_filename
 
 # Anchor paths to the repo root so this works locally and in Railway
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
@@ -10,26 +20,382 @@ TXT_DIR = PROJECT_ROOT / "data" / "txt"
 PDF_DIR.mkdir(parents=True, exist_ok=True)
 TXT_DIR.mkdir(parents=True, exist_ok=True)
 
-def convert_pdf_to_txt(pdf_filename: str) -> Path:
+# Conversion is CPU bound and independent per file, so default to one worker per core.
+DEFAULT_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+
+# Same table markers txt_to_csv.extract_promotion_data keys on
+TABLE_HEADER = "MOS SGT SSG SGT SSG SGT SSG"
+TABLE_TERMINATORS = ("Note 1:", "SUBJECT:", "TOTALS")  # each closes a table; another may follow
+MOS_ROW_RE = re.compile(r"^\d{2}[A-Z]")
+PREAMBLE_MAX_LINES = 40
+# The same markers in a page's character stream, which has no spaces.
+_HEADER_CHARS = TABLE_HEADER.replace(" ", "")
+_TERMINATOR_CHARS = tuple(marker.replace(" ", "") for marker in TABLE_TERMINATORS)
+
+# A conversion aborts once its process's RSS passes this many MB (0 = no
+# limit). The limit is per process, so budget it as total memory / workers.
+MAX_RSS_MB = float(os.environ.get("PDF_MAX_RSS_MB", 0))
+
+
+def code_digest(*names: str) -> str:
+    """
+    Digest of the pdfplumber version and the named sibling scripts. A cache
+    of parsed results lives in a directory named after the digest of the
+    code that produced them, so editing that code starts a fresh cache.
+    """
+    digest = hashlib.sha256(pdfplumber.__version__.encode())
+    for name in names:
+        digest.update((Path(__file__).resolve().parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# First-page screening decisions, keyed by PDF sha256, in a directory per
+# version of the classifier.
+SCREEN_CACHE_DIR = PROJECT_ROOT / "data" / "cache" / "screen"
+SCREEN_CACHE_KEY = code_digest("pdf_to_txt.py", "rename_txts.py")
+
+
+def open_pdf(source):
+    """Opens a PDF from a path or a binary file object (e.g. io.BytesIO of downloaded bytes)."""
+    return pdfplumber.open(source if hasattr(source, "read") else str(source))
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def check_rss(max_rss_mb: float, where: str) -> float:
+    """Returns the current RSS in MB; raises MemoryError when it is above max_rss_mb (if set)."""
+    current = rss_mb()
+    if max_rss_mb and current > max_rss_mb:
+        raise MemoryError(f"RSS {current:.0f} MB exceeds the {max_rss_mb:.0f} MB limit at {where}")
+    return current
+
+
+def iter_page_texts(pdf_path: Path, first_page_text: str | None = None, max_rss_mb: float = MAX_RSS_MB):
+    """
+    Yields each page's text (None for an empty page), one page at a time.
+    pdfplumber keeps every parsed character and layout object on the page
+    until it is closed, so each page is closed before the next is parsed
+    and memory is bounded by the largest page, not the whole document.
+    """
+    with open_pdf(pdf_path) as pdf:
+        for i, page in enumerate(pdf.pages):
+            text = first_page_text if i == 0 and first_page_text is not None else page.extract_text()
+            page.close()
+            check_rss(max_rss_mb, f"page {i + 1}")
+            yield text
+
+
+def extract_pdf_text(pdf_path: Path, first_page_text: str | None = None) -> tuple[str, int]:
+    """
+    Returns the text of every non-empty page joined by newlines, and the page
+    count. Pass first_page_text when page 1 was already extracted (screening)
+    so it isn't parsed twice.
+    """
+    page_texts = list(iter_page_texts(pdf_path, first_page_text))
+    return "\n".join(text for text in page_texts if text), len(page_texts)
+
+
+def write_pdf_text(
+    pdf_path: Path, txt_path: Path, first_page_text: str | None = None, max_rss_mb: float = MAX_RSS_MB
+) -> tuple[int, float]:
+    """
+    Streams the same text extract_pdf_text returns into txt_path, page by
+    page, so the document's text is never held in memory as a whole.
+    Returns (pages, peak RSS in MB sampled after each page). The file is
+    written under a temporary name and only replaces txt_path when complete.
+    """
+    tmp_path = txt_path.with_suffix(".txt.tmp")
+    pages = 0
+    peak = rss_mb()
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            separator = ""
+            for text in iter_page_texts(pdf_path, first_page_text, max_rss_mb):
+                pages += 1
+                peak = max(peak, rss_mb())
+                if text:
+                    out.write(separator + text)
+                    separator = "\n"
+        os.replace(tmp_path, txt_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return pages, peak
+
+
+def _find_all(text: str, needle: str) -> list[int]:
+    found = []
+    start = text.find(needle)
+    while start != -1:
+        found.append(start)
+        start = text.find(needle, start + 1)
+    return found
+
+
+def table_region(page, in_table: bool, first_page: bool = False):
+    """
+    The page's (top, bottom) span that can hold table rows, found from its
+    characters alone, or None when it holds none. It runs from the first
+    TABLE_HEADER (the page top when a table continues onto it) to the
+    terminator closing the last table on the page (the page bottom when
+    that table runs on). The first page is kept whole for its memo header.
+    """
+    chars = [c for c in page.chars if not c["text"].isspace()]
+    text = "".join(c["text"] for c in chars)
+    headers = _find_all(text, _HEADER_CHARS)
+    if not headers and not in_table and not first_page:
+        return None
+
+    if first_page:
+        return page.bbox[1], page.bbox[3]  # the memo header may sit on either side of the table
+    top = page.bbox[1] if in_table else chars[headers[0]]["top"]
+    last_header = headers[-1] if headers else -1
+    ends = [i for marker in _TERMINATOR_CHARS for i in _find_all(text, marker) if i > last_header]
+    bottom = chars[min(ends)]["bottom"] if ends else page.bbox[3]
+    return top, bottom
+
+
+def extract_table_rows(
+    pdf_path: Path, screen=None, max_rss_mb: float = MAX_RSS_MB
+) -> tuple[list[str], list[list[str]], int]:
+    """
+    Table-only extraction. Keeps only the lines inside a cutoff table's
+    region (below a TABLE_HEADER line and above the next "Note 1:",
+    "TOTALS" or "SUBJECT:"). Every page is read, as a document can hold more
+    than one table, e.g. a second memo appended after the first one's totals.
+
+    Laying a page out into lines costs more than parsing its characters, so
+    table_region() locates the table from the characters first: a page
+    without one is never laid out, and the others are cropped to the table
+    before they are.
+
+    Returns
+        preamble: the first page's lines above the table (memo header and
+            SUBJECT, used by rename_txts to classify the document)
+        rows: one [MOS, Cutoff_SGT, Cutoff_SSG, Eligibles_SGT, Eligibles_SSG,
+            Promotions_SGT, Promotions_SSG] list per table row, as strings
+        pages_read: how many pages were parsed
+
+    screen, if given, is called with the preamble once the first page is
+    parsed; returning False stops before any further page is opened.
+    """
+    preamble = []
+    rows = []
+    pages_read = 0
+    in_table = False
+
+    with open_pdf(pdf_path) as pdf:
+        for page in pdf.pages:
+            pages_read += 1
+            region = table_region(page, in_table, first_page=pages_read == 1)
+            if region is None:
+                lines = []
+            else:
+                x0, page_top, x1, page_bottom = page.bbox
+                top, bottom = max(region[0] - 1, page_top), min(region[1] + 1, page_bottom)
+                if bottom <= top:  # characters drawn out of reading order
+                    top, bottom = page_top, page_bottom
+                lines = page.crop((x0, top, x1, bottom)).extract_text_lines(return_chars=False)
+
+            for line in lines:
+                text = line["text"].strip()
+                if TABLE_HEADER in text:
+                    in_table = True
+                    continue
+
+                if not in_table:
+                    if pages_read == 1 and len(preamble) < PREAMBLE_MAX_LINES:
+                        preamble.append(text)
+                    continue
+
+                if any(marker in text for marker in TABLE_TERMINATORS):
+                    in_table = False  # another header may open the next table
+                    continue
+
+                if MOS_ROW_RE.match(text):
+                    values = text.split()
+                    if len(values) == 7:
+                        rows.append(values)
+
+            page.close()
+            check_rss(max_rss_mb, f"page {pages_read}")
+            if pages_read == 1 and screen is not None and not screen(preamble):
+                break
+
+    return preamble, rows, pages_read
+
+
+def screen_text(filename: str, text: str, cutoff=DEFAULT_CUTOFF) -> tuple[bool, str, str | None]:
+    """
+    Decides from partial text (first page or memo header) whether a document
+    is worth converting. Returns (keep, reason, base_name).
+
+    Only drops what the later stages would drop anyway: a non-series
+    document (trend report, point-change memo) or a month before the cutoff
+    date. Anything undecided is kept and classified on its full text later.
+    """
+    _, base_name, reason = classify_document(filename, text)
+    if reason == "non-series document":
+        return False, reason, None
+    if base_name and should_delete(f"{base_name}.txt", cutoff):
+        return False, "before cutoff date", base_name
+    return True, reason, base_name
+
+
+def screen_pdf(pdf_path: Path, cutoff=DEFAULT_CUTOFF) -> tuple[bool, str, str | None]:
+    """
+    Screens a PDF on its filename and first page. The classification is
+    cached by file hash; the date cutoff is applied on top, so changing it
+    doesn't invalidate the cache.
+    """
+    keep, reason, base_name, _ = _screen_pdf(pdf_path, cutoff)
+    return keep, reason, base_name
+
+
+def _screen_pdf(pdf_path: Path, cutoff=DEFAULT_CUTOFF) -> tuple[bool, str, str | None, str | None]:
+    # Also returns the first page's text when it had to be extracted.
+    keep, reason, base_name, first_page = _screen_pdf_uncut(Path(pdf_path))
+    if keep and base_name and should_delete(f"{base_name}.txt", cutoff):
+        return False, "before cutoff date", base_name, first_page
+    return keep, reason, base_name, first_page
+
+
+def _screen_pdf_uncut(pdf_path: Path) -> tuple[bool, str, str | None, str | None]:
+    if should_skip_filename(pdf_path.name.upper()):
+        return False, "non-series document", None, None
+
+    digest = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+    cache_path = SCREEN_CACHE_DIR / SCREEN_CACHE_KEY / f"{digest}.json"
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached["filename"] == pdf_path.name:
+            return cached["keep"], cached["reason"], cached["base_name"], None
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with open_pdf(pdf_path) as pdf:
+        first_page = (pdf.pages[0].extract_text() or "") if pdf.pages else ""
+    keep, reason, base_name = screen_text(pdf_path.name, first_page, cutoff=None)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".json.tmp")
+    tmp_path.write_text(
+        json.dumps({"filename": pdf_path.name, "keep": keep, "reason": reason, "base_name": base_name}),
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, cache_path)
+    return keep, reason, base_name, first_page
+
+
+def convert_pdf_to_txt(pdf_filename: str, tables_only: bool = False) -> Path:
+    txt_path, _, _, _, _ = _convert_pdf(pdf_filename, tables_only)
+    return txt_path
+
+
+def _convert_pdf(
+    pdf_filename: str, tables_only: bool = False, screen: bool = False, max_rss_mb: float = MAX_RSS_MB
+) -> tuple[Path | None, int, float, float, str | None]:
+    """
+    Returns (txt_path, pages, seconds, peak_rss_mb, skip_reason); txt_path is
+    None when screening dropped the PDF.
+    """
+    start = time.perf_counter()
     pdf_path = PDF_DIR / pdf_filename
     txt_filename = pdf_filename.replace(".pdf", ".txt")
     txt_path = TXT_DIR / txt_filename
 
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        text = "\n".join(
-            [page.extract_text() for page in pdf.pages if page.extract_text()]
-        )
+    first_page_text = None
+    if screen:
+        keep, reason, _, first_page_text = _screen_pdf(pdf_path)
+        if not keep:
+            return None, 0, time.perf_counter() - start, rss_mb(), reason
 
-    txt_path.write_text(text, encoding="utf-8")
+    if tables_only:
+        # Same layout the downstream scripts expect: memo header with the
+        # SUBJECT line, then the table header, rows and a terminator.
+        preamble, rows, pages = extract_table_rows(pdf_path, max_rss_mb=max_rss_mb)
+        lines = preamble + [TABLE_HEADER] + [" ".join(row) for row in rows] + ["TOTALS"]
+        txt_path.write_text("\n".join(lines), encoding="utf-8")
+        peak = rss_mb()
+    else:
+        pages, peak = write_pdf_text(pdf_path, txt_path, first_page_text, max_rss_mb)
 
-    return txt_path
+    return txt_path, pages, time.perf_counter() - start, peak, None
 
 
-if __name__ == "__main__":
-    pdf_files = [f for f in PDF_DIR.iterdir() if f.is_file() and f.suffix.lower() == ".pdf"]
+def convert_all_pdfs(
+    workers: int = DEFAULT_WORKERS, tables_only: bool = False, screen: bool = True, max_rss_mb: float = MAX_RSS_MB
+) -> list[str]:
+    """
+    Converts every PDF in PDF_DIR over a process pool and reports per-file
+    timing, worker RSS and progress. With screen, PDFs whose first page shows
+    they are out of scope (see screen_text) are skipped instead of converted.
+    A PDF that pushes its worker past max_rss_mb fails instead of growing
+    further. Returns the names of PDFs that failed to convert.
+    """
+    pdf_files = sorted(f.name for f in PDF_DIR.iterdir() if f.is_file() and f.suffix.lower() == ".pdf")
     total = len(pdf_files)
+    workers = max(1, min(workers, total or 1))
+    failed = []
+    skipped = 0
+    peak_rss = 0.0
+
+    limit = f", {max_rss_mb:.0f} MB RSS limit per worker" if max_rss_mb else ""
+    print(f"Converting {total} PDFs with {workers} worker(s){limit}")
+    run_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_convert_pdf, name, tables_only, screen, max_rss_mb): name for name in pdf_files}
+        for i, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            percent = (i / total) * 100 if total else 100
+            try:
+                txt_path, pages, seconds, peak, skip_reason = future.result()
+            except Exception as e:
+                failed.append(name)
+                print(f"[ERROR] Failed to convert {name}: {e} | {percent:.2f}% complete")
+                continue
+            peak_rss = max(peak_rss, peak)
+            if txt_path is None:
+                skipped += 1
+                print(f"[SKIP] {name}: {skip_reason} | {percent:.2f}% complete")
+                continue
+            print(f"Converted {name} ({pages} pages, {seconds:.2f}s, {peak:.0f} MB) | {percent:.2f}% complete")
+
+    elapsed = time.perf_counter() - run_start
+    print(
+        f"Converted {total - len(failed) - skipped}/{total} PDFs ({skipped} screened out) in {elapsed:.2f}s, "
+        f"peak worker RSS {peak_rss:.0f} MB"
+    )
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert data/pdfs/*.pdf to data/txt/*.txt")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of conversion processes (default: PDF_WORKERS or CPU count)",
+    )
+    parser.add_argument(
+        "--tables-only",
+        action="store_true",
+        help="Only extract the memo header and the cutoff table instead of every page",
+    )
+    parser.add_argument(
+        "--no-screen",
+        action="store_true",
+        help="Convert every PDF instead of skipping ones whose first page is out of scope",
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        default=MAX_RSS_MB,
+        help="Fail a conversion once its worker's RSS passes this many MB (default: PDF_MAX_RSS_MB or no limit)",
+    )
+    args = parser.parse_args()
 
-    for i, pdf_file in enumerate(pdf_files, start=1):
-        convert_pdf_to_txt(pdf_file.name)
-        percent = (i / total) * 100 if total else 100
-        print(f"Converted {pdf_file.name} | {percent:.2f}% complete")
\ No newline at end of file
+    if convert_all_pdfs(args.workers, args.tables_only, screen=not args.no_screen, max_rss_mb=args.max_rss_mb):
+        raise SystemExit(1)
@@ -0,0 +1,364 @@
+"""
+pipeline_dag.py
+
+Incremental runner for the data pipeline.
+
+Stages form a dependency graph. Each stage declares the files it reads
+(including its own source code) and the files it produces. A stage is rerun
+only when the sha256 digest of its inputs differs from the last successful
+run, or when its outputs are missing. Results are recorded in
+data/pipeline_state.json after every stage, so a failed run resumes from the
+failed stage next time.
+
+Every executed stage records wall time, CPU time (this process plus reaped
+child processes such as the ingest pool), peak RSS, bytes read and written
+and whatever counts the stage reports (pages, rows, per-file timings). Each
+run's numbers are written as a profile, see pipeline_profile.py.
+
+With options["stream"] the scrape stage runs stream_ingest.py, which parses
+PDFs while they download, and the ingest stage is recorded as done by it.
+Stages named in options["skip"] don't run (ingest_daemon.py skips the scrape
+when it is only reacting to files dropped into data/pdfs).
+"""
+
+import hashlib
+import json
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psutil
+
+from cleanup_oldtxts import current_cutoff, cutoff_setting
+from pipeline_profile import new_profile, write_profile
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+DATA_DIR = PROJECT_ROOT / "data"
+STATE_FILE = DATA_DIR / "pipeline_state.json"
+
+PDFS_DIR = DATA_DIR / "pdfs"
+MASTER_FILE = DATA_DIR / "master" / "master_promotion_data.csv"
+MASTER_DB = MASTER_FILE.with_suffix(".sqlite")
+PARTITION_INDEX = MASTER_FILE.parent / "partitions" / "index.json"
+VERSION_LOG = MASTER_FILE.parent / "versions" / "log.jsonl"
+SNAPSHOT_INDEX = DATA_DIR / "snapshots" / "index.json"
+
+
+def pdf_files() -> list[Path]:
+    if not PDFS_DIR.exists():
+        return []
+    return sorted(f for f in PDFS_DIR.iterdir() if f.is_file() and f.suffix.lower() == ".pdf")
+
+
+def _sources(*names: str) -> list[Path]:
+    return [PROJECT_ROOT / name for name in names]
+
+
+# Stage runners return a dict of counts for the run profile. A runner that
+# also does a later stage's work lists it under "completes".
+def _run_scrape(options: dict) -> dict:
+    if options.get("stream"):
+        from stream_ingest import stream_ingest
+
+        stats = {}
+        stream_ingest(keep_intermediates=options.get("keep_intermediates", False), stats=stats, cutoff=current_cutoff())
+        return {**stats, "completes": ["ingest"]}
+
+    from scrape_pdfs import download_pdfs
+
+    return {"downloads": download_pdfs(cutoff=current_cutoff())}
+
+
+def _run_ingest(options: dict) -> dict:
+    from ingest import ingest_all
+
+    stats = {}
+    ingest_all(keep_intermediates=options.get("keep_intermediates", False), stats=stats, cutoff=current_cutoff())
+    return stats
+
+
+def _run_build_database(options: dict) -> dict:
+    from build_database import build_database
+
+    return {"rows": build_database(MASTER_FILE, MASTER_DB)}
+
+
+def _run_record_version(options: dict) -> dict:
+    from record_version import record
+
+    return record(MASTER_FILE, VERSION_LOG.parent)
+
+
+def _run_export_snapshots(options: dict) -> dict:
+    from export_snapshots import export_snapshots
+
+    return {"snapshots": export_snapshots()}
+
+
+# name -> stage. "always" stages have no local inputs to compare (the scraper
+# revalidates against the site with conditional requests instead). "params"
+# are settings hashed along with the inputs.
+STAGES = {
+    "scrape_pdfs": {
+        "deps": (),
+        "always": True,
+        "inputs": lambda: [],
+        "outputs": lambda: [],
+        "run": _run_scrape,
+    },
+    "ingest": {
+        "deps": ("scrape_pdfs",),
+        "inputs": lambda: pdf_files() + _sources(
+            "scripts/ingest.py",
+            "scripts/pdf_to_txt.py",
+            "scripts/rename_txts.py",
+            "scripts/cleanup_oldtxts.py",
+            "scripts/txt_to_csv.py",
+            "scripts/compile_master_dataset.py",
+        ),
+        # The cutoff the master was last built with unless CUTOFF_START says otherwise.
+        "params": lambda: {"CUTOFF_START": cutoff_setting()},
+        "outputs": lambda: [MASTER_FILE, PARTITION_INDEX],
+        "run": _run_ingest,
+    },
+    "build_database": {
+        "deps": ("ingest",),
+        "inputs": lambda: [MASTER_FILE] + _sources("scripts/build_database.py", "data_loader.py"),
+        "outputs": lambda: [MASTER_DB],
+        "run": _run_build_database,
+    },
+    "record_version": {
+        "deps": ("ingest",),
+        "inputs": lambda: [MASTER_FILE] + _sources("scripts/record_version.py", "data_loader.py"),
+        "outputs": lambda: [VERSION_LOG],
+        "run": _run_record_version,
+    },
+    # After build_database, so a DATA_BACKEND=sqlite environment exports the new release.
+    "export_snapshots": {
+        "deps": ("ingest", "build_database"),
+        "inputs": lambda: [MASTER_FILE] + _sources(
+            "scripts/export_snapshots.py",
+            "data_loader.py",
+            "dashboard_scripts/snapshots.py",
+            "dashboard_scripts/series_figures.py",
+            "dashboard_scripts/predict_next_promotion.py",
+            "dashboard_scripts/calculate_promotion_percentage.py",
+            "dashboard_scripts/update_change_graph.py",
+        ),
+        "outputs": lambda: [SNAPSHOT_INDEX],
+        "run": _run_export_snapshots,
+    },
+}
+
+
+def topological_order(stages: dict) -> list[str]:
+    order = []
+    done = set()
+    visiting = set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle at stage {name}")
+        if name not in stages:
+            raise KeyError(f"Unknown stage: {name}")
+        visiting.add(name)
+        for dep in stages[name]["deps"]:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def load_state() -> dict:
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("stages", {})
+    state.setdefault("file_hashes", {})
+    return state
+
+
+def save_state(state: dict) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = STATE_FILE.with_suffix(".json.tmp")
+    tmp_file.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_file, STATE_FILE)
+
+
+def file_digest(path: Path, state: dict) -> str:
+    """sha256 of a file, memoized in the state by (size, mtime) so unchanged files aren't re-read."""
+    stat = path.stat()
+    key = str(path.relative_to(PROJECT_ROOT))
+    signature = [stat.st_size, stat.st_mtime_ns]
+    cached = state["file_hashes"].get(key)
+    if cached and cached["signature"] == signature:
+        return cached["sha256"]
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    state["file_hashes"][key] = {"signature": signature, "sha256": digest}
+    return digest
+
+
+def inputs_digest(stage: dict, state: dict) -> str:
+    h = hashlib.sha256()
+    for path in sorted(stage["inputs"]()):
+        rel = str(path.relative_to(PROJECT_ROOT))
+        h.update(rel.encode())
+        h.update(file_digest(path, state).encode() if path.exists() else b"missing")
+    if "params" in stage:
+        h.update(json.dumps(stage["params"](), sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def stage_status(name: str, state: dict) -> tuple[bool, str]:
+    """Returns (needs_run, reason) for one stage against the recorded state."""
+    stage = STAGES[name]
+    record = state["stages"].get(name)
+    if stage.get("always"):
+        return True, "always runs"
+    if record is None or record.get("status") != "ok":
+        return True, "no successful run recorded" if record is None else f"last run {record.get('status')}"
+    missing = [str(p.relative_to(PROJECT_ROOT)) for p in stage["outputs"]() if not p.exists()]
+    if missing:
+        return True, f"missing outputs: {', '.join(missing)}"
+    if inputs_digest(stage, state) != record.get("inputs_digest"):
+        return True, "inputs changed"
+    return False, "up to date"
+
+
+def plan(state: dict | None = None) -> list[tuple[str, bool, str]]:
+    """
+    Dry-run plan against the files currently on disk. Stages downstream of a
+    stage that will run are reported against today's inputs, since their real
+    inputs only exist once the upstream stage has finished.
+    """
+    state = state if state is not None else load_state()
+    return [(name, *stage_status(name, state)) for name in topological_order(STAGES)]
+
+
+def _io_snapshot() -> tuple[int, int]:
+    # read_chars/write_chars count every read()/write() including page-cache hits.
+    try:
+        io = psutil.Process().io_counters()
+    except (psutil.Error, AttributeError, NotImplementedError):
+        return 0, 0
+    return getattr(io, "read_chars", io.read_bytes), getattr(io, "write_chars", io.write_bytes)
+
+
+def _usage_snapshot() -> tuple[float, float]:
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = self_usage.ru_utime + self_usage.ru_stime + child_usage.ru_utime + child_usage.ru_stime
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak_rss = max(self_usage.ru_maxrss, child_usage.ru_maxrss) * scale
+    return cpu, peak_rss
+
+
+def run_stage(name: str, options: dict) -> dict:
+    """Runs one stage and returns its timings merged with the counts it reports."""
+    stage = STAGES[name]
+    wall_start = time.perf_counter()
+    cpu_start, _ = _usage_snapshot()
+    read_start, written_start = _io_snapshot()
+
+    metrics = stage["run"](options) or {}
+
+    cpu_end, peak_rss = _usage_snapshot()
+    read_end, written_end = _io_snapshot()
+    # Worker processes read the PDFs themselves; they report those bytes per file.
+    worker_read = sum(f.get("bytes_read", 0) for f in metrics.get("files", []) if not f.get("cached"))
+    return {
+        "wall_s": round(time.perf_counter() - wall_start, 3),
+        "cpu_s": round(cpu_end - cpu_start, 3),
+        # Process-wide high-water mark, so it includes earlier stages of this run.
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+        "rss_mb": round(psutil.Process().memory_info().rss / 2**20, 1),
+        "bytes_read": read_end - read_start + worker_read,
+        "bytes_written": written_end - written_start,
+        **metrics,
+    }
+
+
+def run_pipeline(options: dict | None = None, force: bool = False) -> dict:
+    """
+    Runs every stage that needs it, in dependency order. Returns the updated
+    state; raises RuntimeError naming the stage that failed.
+    """
+    options = options or {}
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+
+    state = load_state()
+    profile = new_profile()
+    run_start = time.perf_counter()
+    timings = {}
+    completed_by = {}
+    try:
+        for name in topological_order(STAGES):
+            if name in completed_by:
+                profile["stages"][name] = {"ran": False, "reason": f"done by {completed_by[name]}"}
+                print(f"[SKIP] {name}: done by {completed_by[name]}")
+                continue
+            if name in options.get("skip", ()):
+                profile["stages"][name] = {"ran": False, "reason": "skipped by caller"}
+                print(f"[SKIP] {name}: skipped by caller")
+                continue
+            needs_run, reason = (True, "forced") if force else stage_status(name, state)
+            profile["stages"][name] = {"ran": needs_run, "reason": reason}
+            if not needs_run:
+                print(f"[SKIP] {name}: {reason}")
+                continue
+
+            print(f"\nRUNNING {name} ({reason})")
+            started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            try:
+                metrics = run_stage(name, options)
+            except Exception as e:
+                state["stages"][name] = {"status": "failed", "error": str(e), "started_at": started_at}
+                save_state(state)
+                profile["stages"][name]["error"] = str(e)
+                raise RuntimeError(f"Stage {name} failed: {e}") from e
+
+            completes = metrics.pop("completes", [])
+            profile["stages"][name].update(metrics)
+            timings[name] = {k: metrics[k] for k in ("wall_s", "cpu_s", "peak_rss_mb")}
+            for done in [name, *completes]:
+                completed_by[done] = name
+                state["stages"][done] = {
+                    "status": "ok",
+                    "inputs_digest": inputs_digest(STAGES[done], state),
+                    "started_at": started_at,
+                    "timings": timings[name],
+                }
+            save_state(state)
+            print(f"COMPLETE {name} {timings[name]}")
+        profile["status"] = "ok"
+    except Exception:
+        profile["status"] = "failed"
+        raise
+    finally:
+        profile["wall_s"] = round(time.perf_counter() - run_start, 3)
+        print(f"Profile written to {write_profile(profile)}")
+
+    print_timings(timings)
+    return state
+
+
+def print_timings(timings: dict) -> None:
+    if not timings:
+        print("\nNothing to do, every stage is up to date")
+        return
+    print(f"\n{'stage':<20}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}")
+    for name, t in timings.items():
+        print(f"{name:<20}{t['wall_s']:>10.2f}{t['cpu_s']:>10.2f}{t['peak_rss_mb']:>10.1f}")
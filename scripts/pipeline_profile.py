@@ -0,0 +1,182 @@
+"""
+pipeline_profile.py
+
+JSON profiles of pipeline runs and a run-over-run comparison.
+
+pipeline_dag.run_pipeline writes one profile per run to
+data/profiles/<UTC timestamp>.json holding, per stage, wall/CPU time, peak
+RSS, bytes read and written, pages and rows, and (for ingest) one entry per
+PDF.
+
+Usage
+    python scripts/pipeline_profile.py list
+    python scripts/pipeline_profile.py show [PROFILE]
+    python scripts/pipeline_profile.py diff [OLD NEW] [--threshold 0.2]
+
+diff compares the two most recent profiles by default and exits with status
+1 when a stage or file got slower, bigger or hungrier beyond the threshold.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+PROFILE_DIR = PROJECT_ROOT / "data" / "profiles"
+
+# metric -> smallest absolute increase worth flagging, so noise on tiny
+# numbers (a 0.01s stage taking 0.02s) isn't reported as a regression.
+STAGE_METRICS = {
+    "wall_s": 0.5,
+    "cpu_s": 0.5,
+    "peak_rss_mb": 16.0,
+    "bytes_read": 1 << 20,
+    "bytes_written": 1 << 20,
+}
+FILE_METRICS = {"seconds": 0.25}
+DEFAULT_THRESHOLD = 0.2
+
+
+def new_profile() -> dict:
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "stages": {},
+    }
+
+
+def write_profile(profile: dict, profile_dir: Path = PROFILE_DIR) -> Path:
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stamp = profile["started_at"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    path = profile_dir / f"{stamp}.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(profile, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_profiles(profile_dir: Path = PROFILE_DIR) -> list[Path]:
+    if not profile_dir.exists():
+        return []
+    return sorted(profile_dir.glob("*.json"))
+
+
+def load_profile(path: Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _regression(metric: str, old, new, min_delta: float, threshold: float) -> dict | None:
+    if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+        return None
+    delta = new - old
+    if delta < min_delta or delta <= abs(old) * threshold:
+        return None
+    return {"metric": metric, "old": old, "new": new, "change": round(delta / old, 3) if old else None}
+
+
+def diff_profiles(old: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Returns one entry per regression: {"stage", "file" (or None), "metric",
+    "old", "new", "change"}. Only stages/files present in both runs and
+    actually executed in both are compared.
+    """
+    regressions = []
+    for name, new_stage in new["stages"].items():
+        old_stage = old["stages"].get(name)
+        if not old_stage or not old_stage.get("ran") or not new_stage.get("ran"):
+            continue
+
+        for metric, min_delta in STAGE_METRICS.items():
+            found = _regression(metric, old_stage.get(metric), new_stage.get(metric), min_delta, threshold)
+            if found:
+                regressions.append({"stage": name, "file": None, **found})
+
+        old_files = {f["file"]: f for f in old_stage.get("files", []) if not f.get("cached")}
+        for new_file in new_stage.get("files", []):
+            old_file = old_files.get(new_file["file"])
+            if old_file is None or new_file.get("cached"):
+                continue
+            for metric, min_delta in FILE_METRICS.items():
+                found = _regression(metric, old_file.get(metric), new_file.get(metric), min_delta, threshold)
+                if found:
+                    regressions.append({"stage": name, "file": new_file["file"], **found})
+    return regressions
+
+
+def print_profile(profile: dict) -> None:
+    print(f"Run started {profile['started_at']} ({profile.get('status', 'unknown')})")
+    print(f"{'stage':<20}{'wall s':>9}{'cpu s':>9}{'peak MB':>9}{'read MB':>9}{'write MB':>9}{'pages':>8}{'rows':>8}")
+    for name, stage in profile["stages"].items():
+        if not stage.get("ran"):
+            print(f"{name:<20}  skipped: {stage.get('reason')}")
+            continue
+        if "wall_s" not in stage:
+            # A stage that raised (or was interrupted) records no metrics.
+            print(f"{name:<20}  failed: {stage.get('error', 'no metrics recorded')}")
+            continue
+        print(
+            f"{name:<20}{stage['wall_s']:>9.2f}{stage['cpu_s']:>9.2f}{stage['peak_rss_mb']:>9.1f}"
+            f"{stage['bytes_read'] / 2**20:>9.1f}{stage['bytes_written'] / 2**20:>9.1f}"
+            f"{stage.get('pages', 0):>8}{stage.get('rows', 0):>8}"
+            + (f"  {stage['snapshots']} snapshots" if "snapshots" in stage else "")
+        )
+        slowest = sorted(stage.get("files", []), key=lambda f: f["seconds"], reverse=True)[:5]
+        for f in slowest:
+            if f["seconds"]:
+                print(f"    {f['file']:<40}{f['seconds']:>8.2f}s {f['pages']:>3} pages {f['rows']:>5} rows")
+
+
+def _resolve_pair(paths: list[str]) -> tuple[Path, Path]:
+    if len(paths) == 2:
+        return Path(paths[0]), Path(paths[1])
+    profiles = list_profiles()
+    if len(profiles) < 2:
+        raise SystemExit("Need two profiles to compare; run the pipeline twice or pass OLD NEW")
+    return profiles[-2], profiles[-1]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect and compare pipeline run profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List recorded profiles")
+    show = sub.add_parser("show", help="Print one profile (default: latest)")
+    show.add_argument("profile", nargs="?")
+    diff = sub.add_parser("diff", help="Flag regressions between two profiles (default: last two)")
+    diff.add_argument("profiles", nargs="*", metavar="PROFILE")
+    diff.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative increase to flag")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path in list_profiles():
+            profile = load_profile(path)
+            print(f"{path.name}  {profile.get('status', 'unknown')}  {profile.get('wall_s', 0):.1f}s")
+        return 0
+
+    if args.command == "show":
+        profiles = list_profiles()
+        if not args.profile and not profiles:
+            raise SystemExit("No profiles recorded yet")
+        print_profile(load_profile(Path(args.profile) if args.profile else profiles[-1]))
+        return 0
+
+    if len(args.profiles) not in (0, 2):
+        raise SystemExit("diff takes either no profiles or exactly OLD NEW")
+    old_path, new_path = _resolve_pair(args.profiles)
+    regressions = diff_profiles(load_profile(old_path), load_profile(new_path), args.threshold)
+    print(f"Comparing {old_path.name} -> {new_path.name} (threshold {args.threshold:.0%})")
+    if not regressions:
+        print("No regressions")
+        return 0
+    for r in regressions:
+        where = r["stage"] if r["file"] is None else f"{r['stage']}/{r['file']}"
+        change = f"+{r['change']:.0%}" if r["change"] is not None else "new"
+        print(f"[REGRESSION] {where} {r['metric']}: {r['old']} -> {r['new']} ({change})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
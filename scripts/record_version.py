@@ -0,0 +1,54 @@
+"""
+record_version.py
+
+Pipeline stage that runs after compile_master_dataset.py. Adds the new
+master to the append-only version store in data/master/versions, so the
+dashboard and API can answer "as of" an earlier release (e.g. to audit a
+past forecast against what actually happened).
+
+Each release is stored as a compressed line diff against the previous one,
+with a full copy every CHECKPOINT_EVERY releases, and listed in log.jsonl.
+Nothing in the store is ever rewritten or deleted. See
+data_loader.record_version.
+
+Usage
+    python scripts/record_version.py [--list]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from data_loader import LOCAL_CSV_PATH, VERSIONS_DIR, list_versions, record_version  # noqa: E402
+
+
+def record(source: Path = LOCAL_CSV_PATH, store: Path = VERSIONS_DIR) -> dict:
+    entry = record_version(source, store)
+    if entry is None:
+        print(f"[SKIP] {source.name} is already in the version store")
+        return {"recorded": 0}
+    kind = f"diff against {entry['parent']}" if entry["parent"] else "full copy"
+    print(f"[INFO] Recorded version {entry['version']} ({entry['rows']} rows, {kind}, {entry['bytes'] / 1024:.1f} KB)")
+    return {"recorded": 1, "bytes": entry["bytes"]}
+
+
+def print_versions(store: Path = VERSIONS_DIR) -> None:
+    versions = list_versions(store)
+    total = sum(entry["bytes"] for entry in versions)
+    for entry in versions:
+        kind = "diff" if entry["parent"] else "full"
+        print(f"{entry['recorded_at']}  {entry['version']}  {entry['rows']:>7} rows  {kind}  {entry['bytes'] / 1024:8.1f} KB")
+    print(f"{len(versions)} versions, {total / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record the current master in the version store")
+    parser.add_argument("--list", action="store_true", help="List recorded versions instead")
+    args = parser.parse_args()
+    if args.list:
+        print_versions()
+    else:
+        record()
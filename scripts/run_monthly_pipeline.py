@@ -1,19 +1,38 @@
 """
 run_monthly_pipeline.py
 
-Runs the promotion point dashboard data pipeline from a clean slate.
-
-Steps
-1) Delete all files in data/pdfs, data/txt, data/csv
-2) Delete data/master/master_promotion_data.csv
-3) Run scripts in strict order and stop on first failure
+Brings the promotion point dashboard data up to date.
+
+Stages (see pipeline_dag.py)
+1) scrape_pdfs: fetch new or changed PDFs into data/pdfs
+2) ingest: PDFs -> data/master/master_promotion_data.csv (per-PDF rows are
+   cached by content hash, so only new PDFs are parsed)
+3) build_database: index the master into SQLite for DATA_BACKEND=sqlite
+4) record_version: add the master to the append-only version store
+5) export_snapshots: pre-render per-series snapshots from the master
+
+Only stages whose inputs changed since their last successful run are
+executed, and a failed run picks up at the stage that failed. Use --plan to
+see what would run, and --clean to rebuild everything from scratch.
+--stream overlaps stages 1 and 2: each PDF is parsed as soon as it is
+downloaded (see stream_ingest.py).
+
+Months before the cutoff are dropped. It is CUTOFF_START (YYYY-MM or "none")
+when set, else the cutoff the current master was built with (recorded in
+data/master/cutoff.json), else 2023-08, so a history loaded by backfill.py
+is kept by later runs.
+
+Each run writes a JSON profile to data/profiles; compare two runs with
+    python scripts/pipeline_profile.py diff
 """
 
+import argparse
 import sys
-import subprocess
 import shutil
 from pathlib import Path
 
+from pipeline_dag import STATE_FILE, plan, run_pipeline
+
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = PROJECT_ROOT / "data"
@@ -21,19 +40,12 @@ DATA_DIR = PROJECT_ROOT / "data"
 PDFS_DIR = DATA_DIR / "pdfs"
 TXT_DIR = DATA_DIR / "txt"
 CSV_DIR = DATA_DIR / "csv"
+CACHE_DIR = DATA_DIR / "cache"
 MASTER_FILE = DATA_DIR / "master" / "master_promotion_data.csv"
+PARTITIONS_DIR = DATA_DIR / "master" / "partitions"
 
 SCRIPTS_DIR = PROJECT_ROOT / "scripts"
 
-PIPELINE = [
-    "scrape_pdfs.py",
-    "pdf_to_txt.py",
-    "rename_txts.py",
-    "cleanup_oldtxts.py",
-    "txt_to_csv.py",
-    "compile_master_dataset.py",
-]
-
 
 def delete_contents(folder: Path) -> None:
     folder.mkdir(parents=True, exist_ok=True)
@@ -55,24 +67,25 @@ def delete_file(path: Path) -> None:
         raise RuntimeError(f"Failed to delete {path}: {e}") from e
 
 
-def run_script(script_name: str) -> None:
-    script_path = SCRIPTS_DIR / script_name
-    if not script_path.exists():
-        raise FileNotFoundError(f"Pipeline script not found: {script_path}")
+def clean() -> None:
+    print("\nCLEANING DATA DIRECTORIES")
+    for folder in [TXT_DIR, CSV_DIR, CACHE_DIR, PARTITIONS_DIR]:
+        print(f"Clearing {folder}")
+        delete_contents(folder)
 
-    print(f"\nRUNNING {script_name}")
-    result = subprocess.run(
-        [sys.executable, str(script_path)],
-        cwd=str(PROJECT_ROOT),
-    )
+    print(f"Deleting master file {MASTER_FILE}")
+    delete_file(MASTER_FILE)
+    delete_file(MASTER_FILE.with_suffix(".sqlite"))
+    delete_file(STATE_FILE)
 
-    if result.returncode != 0:
-        raise RuntimeError(f"{script_name} failed with exit code {result.returncode}")
 
-    print(f"COMPLETE {script_name}")
+def print_plan() -> None:
+    print("\nPIPELINE PLAN")
+    for name, needs_run, reason in plan():
+        print(f"{'RUN ' if needs_run else 'SKIP'} {name}: {reason}")
 
 
-def main() -> None:
+def main(clean_slate: bool = False, keep_intermediates: bool = False, dry_run: bool = False, stream: bool = False) -> None:
     print(f"Project root: {PROJECT_ROOT}")
 
     if not PROJECT_ROOT.exists():
@@ -82,24 +95,32 @@ def main() -> None:
     if not SCRIPTS_DIR.exists():
         raise FileNotFoundError(f"SCRIPTS_DIR does not exist: {SCRIPTS_DIR}")
 
-    print("\nCLEANING DATA DIRECTORIES")
-    for folder in [TXT_DIR, CSV_DIR]:
-        print(f"Clearing {folder}")
-        delete_contents(folder)
+    if dry_run:
+        print_plan()
+        return
 
-    print(f"Deleting master file {MASTER_FILE}")
-    delete_file(MASTER_FILE)
+    if clean_slate:
+        clean()
 
     print("\nSTARTING PIPELINE")
-    for script in PIPELINE:
-        run_script(script)
+    run_pipeline({"keep_intermediates": keep_intermediates, "stream": stream})
 
     print("\nPipeline finished successfully")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the master dataset, rerunning only stages whose inputs changed")
+    parser.add_argument("--plan", action="store_true", help="Show which stages would run and why, then exit")
+    parser.add_argument("--clean", action="store_true", help="Clear caches, intermediates and the master first")
+    parser.add_argument(
+        "--keep-intermediates",
+        action="store_true",
+        help="Also write data/txt and data/csv debug files during ingest",
+    )
+    parser.add_argument("--stream", action="store_true", help="Parse PDFs while they download")
+    args = parser.parse_args()
     try:
-        main()
+        main(args.clean, args.keep_intermediates, args.plan, args.stream)
     except Exception as e:
         print(f"\nPipeline failed: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -1,21 +1,52 @@
+"""
+scrape_pdfs.py
+
+Downloads the monthly cutoff-score PDFs linked from BASE_URL into data/pdfs.
+
+- One pooled requests.Session, with downloads spread over a bounded thread pool.
+- The index page and every known PDF are fetched conditionally using the
+  ETag/Last-Modified recorded in data/pdfs/manifest.json, so an unchanged
+  month costs a handful of 304s.
+- Bodies are streamed to a .part file and atomically renamed into place.
+
+The site can be swapped for a local stand-in when testing, e.g.
+    python -m http.server 8000 --directory some/dir/with/index.html
+    python scripts/scrape_pdfs.py --base-url http://127.0.0.1:8000/
+"""
+
+import argparse
+import hashlib
+import json
 import os
-import requests
 import re
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
+from urllib.parse import urljoin
 
-from pathlib import Path
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-print("[INFO] Waiting 2 seconds to avoid request spike...")
-time.sleep(2)
+from cleanup_oldtxts import DEFAULT_CUTOFF, before_cutoff, format_cutoff, parse_cutoff
 
 # Define constants
-BASE_URL = "https://www.ncoonfire.com/enlisted-cutoff-scores"
+BASE_URL = os.environ.get("CUTOFF_SCORES_URL", "https://www.ncoonfire.com/enlisted-cutoff-scores")
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 PDF_DIR = PROJECT_ROOT / "data" / "pdfs"
 PDF_DIR.mkdir(parents=True, exist_ok=True)
+MANIFEST_FILE = PDF_DIR / "manifest.json"
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+MAX_WORKERS = int(os.environ.get("SCRAPE_WORKERS", 4))
+TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+_manifest_lock = threading.Lock()
+
 
 # Function to extract the year and month from filenames
 def extract_year_month(filename):
@@ -27,9 +58,52 @@ def extract_year_month(filename):
         return month, year
     return None, None
 
+
+def load_manifest() -> dict:
+    try:
+        manifest = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault("index", {})
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_manifest(manifest: dict) -> None:
+    tmp_file = MANIFEST_FILE.with_suffix(".json.tmp")
+    tmp_file.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_file, MANIFEST_FILE)
+
+
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def conditional_headers(entry: dict) -> dict:
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
 # Function to scrape all PDF links
-def get_promotion_pdfs():
-    response = requests.get(BASE_URL)
+def get_promotion_pdfs(session=None, manifest=None, base_url=BASE_URL):
+    session = session or make_session()
+    manifest = manifest if manifest is not None else load_manifest()
+    index_entry = manifest["index"] if manifest["index"].get("url") == base_url else {}
+
+    response = session.get(base_url, headers=conditional_headers(index_entry), timeout=TIMEOUT)
+    if response.status_code == 304:
+        print("[INFO] Index page unchanged since last run")
+        return index_entry.get("links", [])
     if response.status_code != 200:
         print("Failed to fetch webpage.")
         return []
@@ -40,43 +114,124 @@ def get_promotion_pdfs():
     for link in soup.find_all("a", href=True):
         href = link["href"]
         if href.endswith(".pdf"):
-            full_url = urljoin(BASE_URL, href)
+            full_url = urljoin(base_url, href)
             pdf_links.append(full_url)
 
+    manifest["index"] = {
+        "url": base_url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "links": pdf_links,
+    }
     return pdf_links
 
-def download_pdfs():
-    pdf_links = get_promotion_pdfs()
-    if not pdf_links:
-        print("No PDFs found.")
-        return
 
+def download_pdf(session, pdf_url, manifest) -> str:
+    """
+    Fetches one PDF. Returns "downloaded", "duplicate" (downloaded, but
+    byte-identical to another PDF in the manifest, which is recorded as its
+    "duplicate_of"), "unchanged", "skipped" or "failed".
+    """
+    filename = pdf_url.split("/")[-1]
+    file_path = PDF_DIR / filename
+    entry = manifest["files"].get(filename, {})
+
+    if file_path.exists() and not (entry.get("etag") or entry.get("last_modified")):
+        print(f"[INFO] Already exists, skipping: {filename}")
+        return "skipped"
+
+    headers = conditional_headers(entry) if file_path.exists() else {}
+    tmp_path = file_path.with_name(file_path.name + ".part")
+    try:
+        with session.get(pdf_url, headers=headers, timeout=TIMEOUT, stream=True) as response:
+            if response.status_code == 304:
+                print(f"[INFO] Unchanged: {filename}")
+                return "unchanged"
+            if response.status_code != 200:
+                print(f"[WARN] Failed to download {pdf_url} (Status: {response.status_code})")
+                return "failed"
+
+            sha256 = hashlib.sha256()
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, file_path)
+
+            digest = sha256.hexdigest()
+            with _manifest_lock:
+                duplicate_of = next(
+                    (name for name, other in manifest["files"].items() if name != filename and other.get("sha256") == digest),
+                    None,
+                )
+                manifest["files"][filename] = {
+                    "url": pdf_url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "sha256": digest,
+                    "size": size,
+                    "downloaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "duplicate_of": duplicate_of,
+                }
+        if duplicate_of:
+            # Kept on disk so conditional requests keep working; ingest skips it by hash.
+            print(f"[INFO] Downloaded {filename}, identical to {duplicate_of}")
+            return "duplicate"
+        print(f"[SUCCESS] Downloaded: {filename} ({size / 1024:.0f} KB)")
+        return "downloaded"
+    except requests.exceptions.RequestException as e:
+        print(f"[ERROR] Exception downloading {pdf_url}: {e}")
+        return "failed"
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def select_links(pdf_links, cutoff=DEFAULT_CUTOFF):
+    """Drops links whose filename dates them before the cutoff month (see cleanup_oldtxts.parse_cutoff)."""
+    to_fetch = []
     for pdf_url in pdf_links:
-        print(f"[INFO] Fetching URL: {pdf_url}")
         filename = pdf_url.split("/")[-1]
         month, year = extract_year_month(filename)
 
-        if year and month:
-            if year < 2023 or (year == 2023 and month not in ["AUG", "SEP", "OCT", "NOV", "DEC"]):
-                print(f"[INFO] Skipping (Before Aug 2023): {filename}")
-                continue
-
-        file_path = PDF_DIR / filename
-        if file_path.exists():
-            print(f"[INFO] Already exists, skipping: {filename}")
+        if year and month and before_cutoff(year, month, cutoff):
+            print(f"[INFO] Skipping (Before {format_cutoff(cutoff)}): {filename}")
             continue
+        to_fetch.append(pdf_url)
+    return to_fetch
+
+
+def download_pdfs(base_url=BASE_URL, workers=MAX_WORKERS, cutoff=DEFAULT_CUTOFF):
+    start = time.perf_counter()
+    manifest = load_manifest()
+    session = make_session(workers)
+
+    pdf_links = get_promotion_pdfs(session, manifest, base_url)
+    if not pdf_links:
+        print("No PDFs found.")
+        save_manifest(manifest)
+        return {}
+
+    to_fetch = select_links(pdf_links, cutoff)
+    print(f"[INFO] Fetching {len(to_fetch)} PDFs with {workers} connection(s)")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda url: download_pdf(session, url, manifest), to_fetch))
+    save_manifest(manifest)
+
+    summary = {status: outcomes.count(status) for status in sorted(set(outcomes))}
+    print(f"[INFO] Done in {time.perf_counter() - start:.1f}s: {summary}")
+    return summary
 
-        try:
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-            response = requests.get(pdf_url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                file_path.write_bytes(response.content)
-                print(f"[SUCCESS] Downloaded: {filename}")
-            else:
-                print(f"[WARN] Failed to download {pdf_url} (Status: {response.status_code})")
-        except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Exception downloading {pdf_url}: {e}")
 
 # Entry point
 if __name__ == "__main__":
-    download_pdfs()
+    parser = argparse.ArgumentParser(description="Download cutoff score PDFs into data/pdfs")
+    parser.add_argument("--base-url", default=BASE_URL, help="Index page listing the PDFs")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent downloads")
+    parser.add_argument(
+        "--since", default=None, help="First month to fetch, YYYY-MM or 'none' for everything (default: CUTOFF_START, else the master's recorded cutoff)"
+    )
+    args = parser.parse_args()
+    download_pdfs(args.base_url, args.workers, DEFAULT_CUTOFF if args.since is None else parse_cutoff(args.since))
@@ -0,0 +1,230 @@
+"""
+stream_ingest.py
+
+Streaming mode for scrape + ingest. Each PDF goes on to be classified,
+extracted and parsed as soon as its download finishes, instead of waiting
+for the whole scrape:
+
+    download threads --(bounded queue)--> dispatcher --(bounded in-flight)--> parse processes --> master
+
+- The download queue holds at most --queue-size finished files. When
+  parsing falls behind, downloaders block rather than piling files up.
+- At most two documents per parse worker are in flight.
+- Parsed rows are collected as they arrive. The master is validated and
+  written once, atomically, when the last document is done.
+- PDFs already in data/pdfs that the index no longer links are ingested
+  too, so the master matches ingest.py's.
+- Documents whose bytes were parsed before come from the row cache without
+  touching the pool, and a PDF byte-identical to one already seen this run
+  is not parsed again.
+
+Wall time approaches the slower of downloading and parsing rather than
+their sum.
+
+Usage
+    python scripts/stream_ingest.py [--base-url URL] [--download-workers N] [--workers N] [--queue-size N] [--no-cache] [--since YYYY-MM|none]
+"""
+
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from cleanup_oldtxts import DEFAULT_CUTOFF, parse_cutoff
+from ingest import copy_result, file_stats, finish_ingest, ingest_pdf_file, log_result, lookup_cached_result, store_cached_result
+from pdf_to_txt import DEFAULT_WORKERS, PDF_DIR
+from scrape_pdfs import (
+    BASE_URL,
+    MAX_WORKERS,
+    download_pdf,
+    get_promotion_pdfs,
+    load_manifest,
+    make_session,
+    save_manifest,
+    select_links,
+)
+
+DEFAULT_QUEUE_SIZE = 16
+_DONE = object()
+
+
+def _produce(
+    ready: queue.Queue,
+    stop: threading.Event,
+    base_url: str,
+    download_workers: int,
+    cutoff,
+    summary: dict,
+    errors: list,
+) -> None:
+    """
+    Downloads in a thread pool and queues each PDF path once it is on disk.
+    Once stop is set, paths are dropped instead of queued and the remaining
+    downloads are skipped, so a consumer that gave up can't leave the
+    download threads blocked on a full queue.
+    """
+
+    def offer(item) -> None:
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.5)  # blocks while the parsers are behind
+                return
+            except queue.Full:
+                continue
+
+    try:
+        manifest = load_manifest()
+        session = make_session(download_workers)
+        links = select_links(get_promotion_pdfs(session, manifest, base_url), cutoff)
+        linked = {url.split("/")[-1] for url in links}
+
+        # Local files first: they are ready now and keep the parsers busy during downloads.
+        for path in sorted(PDF_DIR.glob("*.pdf")):
+            if path.name not in linked:
+                offer(path)
+
+        def fetch(url):
+            if stop.is_set():
+                return "cancelled"  # the remaining downloads would only be thrown away
+            status = download_pdf(session, url, manifest)
+            path = PDF_DIR / url.split("/")[-1]
+            if path.exists():
+                offer(path)
+            return status
+
+        with ThreadPoolExecutor(max_workers=download_workers) as pool:
+            for status in pool.map(fetch, links):
+                summary[status] = summary.get(status, 0) + 1
+        save_manifest(manifest)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        offer(_DONE)
+
+
+def stream_ingest(
+    base_url: str = BASE_URL,
+    download_workers: int = MAX_WORKERS,
+    workers: int = DEFAULT_WORKERS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    keep_intermediates: bool = False,
+    use_cache: bool = True,
+    stats: dict | None = None,
+    cutoff=DEFAULT_CUTOFF,
+):
+    run_start = time.perf_counter()
+    workers = max(1, workers)
+    ready = queue.Queue(maxsize=queue_size)
+    downloads = {}
+    errors = []
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_produce,
+        args=(ready, stop, base_url, download_workers, cutoff, downloads, errors),
+        name="scrape",
+        daemon=True,
+    )
+    producer.start()
+
+    results = []
+    file_rows = []
+    seen = set()
+    in_flight = {}
+    by_digest = {}
+    seen_digests = set()
+    duplicates = []
+    parsed = 0
+
+    def collect(done):
+        nonlocal parsed
+        for future in done:
+            path, digest = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                raise RuntimeError(f"Failed to ingest {path.name}: {e}") from e
+            if use_cache:
+                store_cached_result(digest, result)
+            by_digest[digest] = result
+            results.append(result)
+            file_rows.append(file_stats(result, cached=False))
+            parsed += 1
+            log_result(result, f"{len(results)} done")
+
+    print(f"Streaming ingest with {download_workers} download(s) and {workers} parse worker(s)")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                path = ready.get()
+                if path is _DONE:
+                    break
+                collect([future for future in in_flight if future.done()])
+                if path.name in seen:
+                    continue
+                seen.add(path.name)
+
+                digest, cached = lookup_cached_result(path, use_cache, cutoff)
+                if digest in seen_digests:
+                    duplicates.append((path, digest))
+                    continue
+                seen_digests.add(digest)
+                if cached is not None:
+                    by_digest[digest] = cached
+                    results.append(cached)
+                    file_rows.append(file_stats(cached, cached=True))
+                    continue
+
+                while len(in_flight) >= 2 * workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight[pool.submit(ingest_pdf_file, path, cutoff)] = (path, digest)
+
+            collect(wait(in_flight).done)
+    except BaseException:
+        # Release the downloaders: they drop whatever they still fetch, and
+        # anything already queued is discarded so none stays blocked on put().
+        stop.set()
+        while True:
+            try:
+                ready.get_nowait()
+            except queue.Empty:
+                break
+        raise
+    producer.join()
+    for path, digest in duplicates:
+        result = copy_result(by_digest[digest], path.name)
+        results.append(result)
+        file_rows.append(file_stats(result, cached=True))
+    if errors:
+        # Don't publish a master built from a partial download.
+        raise RuntimeError(f"Scrape failed during streaming ingest: {errors[0]}") from errors[0]
+
+    print(f"[INFO] Downloads: {downloads or 'none'}")
+    master_df = finish_ingest(results, file_rows, parsed, run_start, cutoff, keep_intermediates, stats)
+    if stats is not None:
+        stats["downloads"] = downloads
+    return master_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download and ingest PDFs as a streaming pipeline")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--download-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parse processes")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Downloaded files waiting to be parsed")
+    parser.add_argument("--keep-intermediates", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every PDF, ignoring cached rows")
+    parser.add_argument(
+        "--since", default=None, help="First month to keep, YYYY-MM or 'none' for everything (default: CUTOFF_START, else the master's recorded cutoff)"
+    )
+    args = parser.parse_args()
+    stream_ingest(
+        args.base_url,
+        args.download_workers,
+        args.workers,
+        args.queue_size,
+        args.keep_intermediates,
+        not args.no_cache,
+        cutoff=DEFAULT_CUTOFF if args.since is None else parse_cutoff(args.since),
+    )
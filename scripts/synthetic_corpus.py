@@ -0,0 +1,191 @@
+"""
+synthetic_corpus.py
+
+Generates fake cutoff-score memos, as .txt and/or .pdf, in the layout the
+pipeline parses: memo header, SUBJECT line, numbered boilerplate, the
+"MOS SGT SSG SGT SSG SGT SSG" table, then TOTALS and Note 1. ACTIVE and
+RESERVE memos alternate month by month, and a share of documents are
+promotion trend reports or point-change memos that the pipeline must skip.
+
+PDFs are written with a small built-in writer (one Helvetica font, one text
+line per row), so no PDF library is needed. pdfplumber reads them back as
+the same lines.
+
+Usage
+    python scripts/synthetic_corpus.py OUT_DIR [--documents 200] [--seed 0] [--no-pdf] [--no-txt]
+
+Writes OUT_DIR/pdfs/*.pdf and OUT_DIR/txt/*.txt with matching stems, named
+like the real downloads (e.g. SEP-2025-AC-Cutoff-Scores.pdf).
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+SUBJECTS = {
+    "ACTIVE": "SUBJECT: Active Army Promotion Point Cutoff Scores for 1 {month} {year}",
+    "RESERVE": (
+        "SUBJECT: U.S. Army Reserve Active Guard Reserve (AGR) Promotion Point Cutoff Scores "
+        "for 1 {month} {year}"
+    ),
+}
+FILE_TAGS = {"ACTIVE": "AC", "RESERVE": "AGR"}
+TABLE_HEADER = "MOS SGT SSG SGT SSG SGT SSG"
+
+START_YEAR, START_MONTH = 2023, 8  # first month the pipeline keeps
+YEARS_BEFORE_WRAP = 7  # keep two-digit years sane for large corpora
+LINES_PER_PAGE = 60
+
+
+def mos_codes(count: int) -> list[str]:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    codes = [f"{n:02d}{letter}" for n in range(10, 100) for letter in letters]
+    return codes[:count]
+
+
+def table_row(mos: str, rng: random.Random) -> str:
+    values = []
+    for _ in range(2):
+        values.append("N/A" if rng.random() < 0.05 else str(rng.randint(24, 798)))
+    eligibles = [rng.randint(0, 900) for _ in range(2)]
+    promotions = [rng.randint(0, min(e, 120)) for e in eligibles]
+    return " ".join([mos] + values + [str(v) for v in eligibles + promotions])
+
+
+def memo_lines(component: str, month: int, year: int, rows: int, rng: random.Random, kind: str = "cutoff") -> list[str]:
+    """
+    One memo as text lines. kind is "cutoff" (a normal series document),
+    "trend" (a promotion trend report) or "changes" (a point-change memo).
+    """
+    month_name = MONTH_NAMES[month - 1]
+    lines = ["DEPARTMENT OF THE ARMY", "MEMORANDUM FOR SEE DISTRIBUTION"]
+    if kind == "trend":
+        lines.append(f"SUBJECT: Promotion Trend Report for {month_name} {year}")
+        lines.append("PROMOTION TREND REPORT")
+    elif kind == "changes":
+        lines.append(f"SUBJECT: Promotion Point Changes for {month_name} {year}")
+    else:
+        lines.append(SUBJECTS[component].format(month=month_name, year=year))
+
+    for i in range(rng.randint(20, 40)):
+        lines.append(f"{i % 9 + 1}. Lorem ipsum boilerplate about the promotion process paragraph number {i}.")
+
+    if kind == "cutoff":
+        lines.append(TABLE_HEADER)
+        lines.extend(table_row(mos, rng) for mos in mos_codes(rows))
+        lines.append("TOTALS 1000 2000 300 400 50 60")
+        lines.append("Note 1: scores are effective the first of the month.")
+    return lines
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, lines: list[str], lines_per_page: int = LINES_PER_PAGE) -> int:
+    """Writes lines as a minimal text PDF, lines_per_page per page. Returns the file size."""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = []  # object bodies, numbered from 1
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    for i, page_lines in enumerate(pages):
+        content = "BT /F1 10 Tf 12 TL 40 760 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        stream = content.encode("latin-1", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+
+    path.write_bytes(bytes(out))
+    return len(out)
+
+
+def document_plan(documents: int, rng: random.Random, non_series_share: float = 0.05) -> list[dict]:
+    """Names and kinds for a corpus: ACTIVE/RESERVE pairs per month from Aug 2023 on."""
+    plan = []
+    seen = {}
+    for i in range(documents):
+        slot = i // 2
+        month_index = (START_MONTH - 1 + slot) % (12 * YEARS_BEFORE_WRAP)
+        year = START_YEAR + month_index // 12
+        month = month_index % 12 + 1
+        component = "ACTIVE" if i % 2 == 0 else "RESERVE"
+        kind = "cutoff"
+        if rng.random() < non_series_share:
+            kind = rng.choice(["trend", "changes"])
+
+        if kind == "trend":
+            stem = f"{MONTHS[month - 1]}-{year}-Promotion-Trend-Report"
+        elif kind == "changes":
+            stem = f"{MONTHS[month - 1]}-{year}-{FILE_TAGS[component]}-Point-Changes"
+        else:
+            stem = f"{MONTHS[month - 1]}-{year}-{FILE_TAGS[component]}-Cutoff-Scores"
+        copies = seen.get(stem, 0)
+        seen[stem] = copies + 1
+        if copies:
+            stem = f"{stem}-{copies + 1}"
+
+        plan.append({"stem": stem, "component": component, "month": month, "year": year, "kind": kind})
+    return plan
+
+
+def generate_corpus(
+    out_dir: Path, documents: int = 200, seed: int = 0, rows: int = 120, pdf: bool = True, txt: bool = True
+) -> dict:
+    """Writes the corpus and returns counts: documents, series documents, table rows and bytes."""
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    pdf_dir, txt_dir = out_dir / "pdfs", out_dir / "txt"
+    if pdf:
+        pdf_dir.mkdir(parents=True, exist_ok=True)
+    if txt:
+        txt_dir.mkdir(parents=True, exist_ok=True)
+
+    totals = {"documents": 0, "series_documents": 0, "rows": 0, "pdf_bytes": 0, "txt_bytes": 0}
+    for doc in document_plan(documents, rng):
+        doc_rows = rng.randint(rows // 2, rows) if doc["kind"] == "cutoff" else 0
+        lines = memo_lines(doc["component"], doc["month"], doc["year"], doc_rows, rng, doc["kind"])
+        if pdf:
+            totals["pdf_bytes"] += write_pdf(pdf_dir / f"{doc['stem']}.pdf", lines)
+        if txt:
+            text = "\n".join(lines)
+            (txt_dir / f"{doc['stem']}.txt").write_text(text, encoding="utf-8")
+            totals["txt_bytes"] += len(text)
+        totals["documents"] += 1
+        totals["series_documents"] += doc["kind"] == "cutoff"
+        totals["rows"] += doc_rows
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic cutoff-memo corpus")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=120, help="Maximum table rows per memo")
+    parser.add_argument("--no-pdf", action="store_true", help="Only write .txt files")
+    parser.add_argument("--no-txt", action="store_true", help="Only write .pdf files")
+    args = parser.parse_args()
+    totals = generate_corpus(args.out_dir, args.documents, args.seed, args.rows, not args.no_pdf, not args.no_txt)
+    print(f"Wrote {totals['documents']} documents ({totals['series_documents']} cutoff memos, "
+          f"{totals['rows']} table rows) to {args.out_dir}")
@@ -1,7 +1,11 @@
+import argparse
 import os
 import re
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+import pandas as pd
 
 # Define directories
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
@@ -9,60 +13,135 @@ TXT_DIR = PROJECT_ROOT / "data" / "txt"
 CSV_DIR = PROJECT_ROOT / "data" / "csv"
 CSV_DIR.mkdir(parents=True, exist_ok=True)
 
-# Function to extract promotion data from a TXT file
-def extract_promotion_data(txt_path):
-    with open(txt_path, "r", encoding="utf-8") as f:
-        text_content = f.readlines()
+DEFAULT_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 1))
+
+# Table markers, compiled once per process
+TABLE_HEADER = "MOS SGT SSG SGT SSG SGT SSG"
+TABLE_TERMINATORS = ("Note 1:", "SUBJECT:", "TOTALS")
+# rename_txts.generate_unique_filename adds _2, _3... when a month repeats
+FILENAME_RE = re.compile(r"(ACTIVE|RESERVE)_(\w{3})_(\d{2})(?:_\d+)?\.txt")
+MOS_ROW_RE = re.compile(r"^\d{2}[A-Z]")  # Identifies MOS codes at the start of the line
+
+
+class PromotionRecord(NamedTuple):
+    """One MOS row of a cutoff table. Numbers are None where the memo says N/A."""
+    Date: str
+    Component: str
+    MOS: str
+    Cutoff_SGT: int | float | str | None
+    Cutoff_SSG: int | float | str | None
+    Eligibles_SGT: int | float | str | None
+    Eligibles_SSG: int | float | str | None
+    Promotions_SGT: int | float | str | None
+    Promotions_SSG: int | float | str | None
 
-    # Extract metadata (Date and Component)
-    match = re.search(r"(ACTIVE|RESERVE)_(\w{3})_(\d{2})\.txt", os.path.basename(txt_path))
+
+COLUMNS = list(PromotionRecord._fields)
+
+
+def parse_value(value: str) -> int | float | str | None:
+    """Types a table cell the way read_csv would: int, float, None for N/A, else the raw string."""
+    if value == "N/A":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def date_and_component(txt_path) -> tuple[str, str]:
+    match = FILENAME_RE.search(os.path.basename(txt_path))
     if match:
         component, month, year = match.groups()
-        date_str = f"20{year}-{month}"
-    else:
-        date_str, component = "UNKNOWN", "UNKNOWN"
-
-    # Identify all table start points
-    table_start_indices = [i for i, line in enumerate(text_content) if "MOS SGT SSG SGT SSG SGT SSG" in line]
-
-    # Extract relevant lines containing all table sections
-    table_lines = []
-    for start_idx in table_start_indices:
-        for line in text_content[start_idx+1:]: # sperarate the headers
-            # Line that terminates the dataframeinside the cutoff doc
-            if "Note 1:" in line or "SUBJECT:" in line or "TOTALS" in line:
-                break
-            if line.strip():  # Ignore empty lines
-                table_lines.append(line.strip())
-
-    # Clean and parse the table
-    data = []
-    for line in table_lines:
-        if re.match(r"^\d{2}[A-Z]", line):  # Identifies MOS codes at the start of the line
-            values = re.split(r"\s+", line)  # Split by whitespace
-            if len(values) == 7:
-                values = [date_str, component] + values
-                values = [pd.NA if v == "N/A" else v for v in values] #n/ato Nan
-                data.append(values)
-
-    # Create DataFrame with additional columns
-    columns = ["Date", "Component", "MOS", "Cutoff_SGT", "Cutoff_SSG", "Eligibles_SGT",
-               "Eligibles_SSG", "Promotions_SGT", "Promotions_SSG"]
-    df = pd.DataFrame(data, columns=columns)
+        return f"20{year}-{month}", component
+    return "UNKNOWN", "UNKNOWN"
+
+
+def parse_table_lines(lines: Iterable[str], date_str: str, component: str) -> Iterator[PromotionRecord]:
+    """
+    Single pass over a document's lines. A TABLE_HEADER line opens a table and
+    any TABLE_TERMINATORS line closes every open table; MOS rows in between
+    are emitted as records.
 
+    A header seen while a table is still open starts a second overlapping
+    scan, exactly like the old slice-per-header parser, so such rows are
+    emitted once per open table.
+    """
+    note, subject, totals = TABLE_TERMINATORS
+    open_tables = 0
+    for line in lines:
+        if TABLE_HEADER in line:
+            open_tables += 1
+            continue
+        if not open_tables:
+            continue
+        if note in line or subject in line or totals in line:
+            open_tables = 0
+            continue
+
+        stripped = line.strip()
+        if not MOS_ROW_RE.match(stripped):
+            continue
+        values = stripped.split()
+        if len(values) == 7:
+            record = PromotionRecord(date_str, component, values[0], *map(parse_value, values[1:]))
+            for _ in range(open_tables):
+                yield record
+
+
+def extract_records(txt_path) -> list[PromotionRecord]:
+    date_str, component = date_and_component(txt_path)
+    with open(txt_path, "r", encoding="utf-8") as f:
+        return list(parse_table_lines(f, date_str, component))
+
+
+def records_to_frame(records: Iterable[PromotionRecord]) -> pd.DataFrame:
+    return pd.DataFrame(list(records), columns=COLUMNS)
+
+
+def write_csv(txt_path, records: list[PromotionRecord]) -> Path:
     # Save CSV with proper naming convention
     csv_filename = os.path.basename(txt_path).replace(".txt", ".csv")
     csv_path = CSV_DIR / csv_filename
-    df.to_csv(csv_path, index=False)
+    records_to_frame(records).to_csv(csv_path, index=False)
     print(f"Extracted and saved: {csv_filename}")
+    return csv_path
+
+
+# Function to extract promotion data from a TXT file
+def extract_promotion_data(txt_path):
+    return str(write_csv(txt_path, extract_records(txt_path)))
 
-    return str(csv_path)
 
 # process all txt files
-def process_all_txt_files():
-    for txt_filename in os.listdir(TXT_DIR):
-        if txt_filename.endswith(".txt"):
-            extract_promotion_data(str(TXT_DIR / txt_filename))
+def process_all_txt_files(workers: int = DEFAULT_WORKERS, write_csvs: bool = True) -> pd.DataFrame:
+    """
+    Parses every .txt in TXT_DIR over a process pool and returns all rows as
+    one DataFrame. With write_csvs the per-document CSVs that
+    compile_master_dataset.py reads are written as well.
+    """
+    txt_paths = sorted(TXT_DIR / name for name in os.listdir(TXT_DIR) if name.endswith(".txt"))
+    workers = max(1, min(workers, len(txt_paths) or 1))
+
+    if workers == 1:
+        batches = [extract_records(path) for path in txt_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(extract_records, txt_paths, chunksize=16))
+
+    if write_csvs:
+        for txt_path, records in zip(txt_paths, batches):
+            write_csv(txt_path, records)
+
+    return records_to_frame(record for records in batches for record in records)
+
 
 if __name__ == "__main__":
-    process_all_txt_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Parse data/txt/*.txt cutoff tables into data/csv/*.csv")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    process_all_txt_files(args.workers)
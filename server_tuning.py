@@ -0,0 +1,159 @@
+"""
+server_tuning.py
+
+Response compression and cache headers for the Flask server behind Dash.
+
+- Dynamic responses (callback JSON, layout JSON, HTML) are compressed by
+  Flask-Compress when they are larger than COMPRESS_MIN_SIZE.
+- Static files (assets/ CSS and the Dash component bundles) are compressed
+  once at the highest level and served from memory on every later request.
+- Fingerprinted static URLs get long-lived immutable cache headers, and the
+  layout/dependency JSON gets an ETag so repeat visits revalidate with a 304.
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+from flask_compress import Compress
+
+try:
+    import brotli
+except ImportError:  # Flask-Compress normally pulls this in
+    brotli = None
+
+
+COMPRESS_MIN_SIZE = 500
+ONE_YEAR_SECONDS = 31536000
+
+STATIC_PREFIXES = ("/assets/", "/_dash-component-suites/")
+REVALIDATE_PATHS = ("/_dash-layout", "/_dash-dependencies")
+COMPRESSIBLE_MIMETYPES = [
+    "application/javascript",
+    "application/json",
+    "text/css",
+    "text/html",
+    "text/javascript",
+]
+
+# One entry per (file, version, encoding). Dash serves a few dozen bundles and
+# assets, so this holds all of them while a stream of made-up query strings
+# or stale versions can't grow it without bound.
+STATIC_CACHE_MAX_ENTRIES = 256
+
+_static_cache = OrderedDict()
+_static_cache_lock = threading.Lock()
+
+
+def _choose_static_encoding(accept_encodings) -> str | None:
+    # The client's highest-quality encoding we can produce; br wins ties.
+    # Anything listed with q=0 (or not matched by a "*") is refused.
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    quality = {encoding: accept_encodings.quality(encoding) for encoding in offered}
+    best = max(offered, key=lambda encoding: quality[encoding])
+    return best if quality[best] > 0 else None
+
+
+def _compress_static(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9)
+
+
+def _is_fingerprinted(path: str) -> bool:
+    # Dash appends ?m=<mtime> to asset URLs and embeds the package version in
+    # component suite paths, so either one changes whenever the file does.
+    if path.startswith("/assets/"):
+        return "m" in request.args
+    return path.startswith("/_dash-component-suites/") and ".v" in path.rsplit("/", 1)[-1]
+
+
+def _precompressed_static(response):
+    if request.method != "GET" or response.status_code != 200:
+        return response
+    if not request.path.startswith(STATIC_PREFIXES):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or "Content-Encoding" in response.headers:
+        return response
+
+    if _is_fingerprinted(request.path):
+        response.cache_control.public = True
+        response.cache_control.max_age = ONE_YEAR_SECONDS
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+
+    encoding = _choose_static_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    key = (request.path, etag or response.last_modified, encoding)
+    with _static_cache_lock:
+        body = _static_cache.get(key)
+        if body is not None:
+            _static_cache.move_to_end(key)
+    if body is None:
+        response.direct_passthrough = False
+        body = _compress_static(response.get_data(), encoding)
+        with _static_cache_lock:
+            _static_cache[key] = body
+            while len(_static_cache) > STATIC_CACHE_MAX_ENTRIES:
+                _static_cache.popitem(last=False)
+
+    response.direct_passthrough = False
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    if etag:
+        response.set_etag(f"{etag}:{encoding}", weak=weak)
+    return response
+
+
+def _revalidate_layout(response):
+    if request.method != "GET" or request.path not in REVALIDATE_PATHS:
+        return response
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return make_conditional(response)
+
+
+def make_conditional(response):
+    """
+    Turns `response` into an empty 304 when the client already holds its ETag.
+
+    Flask-Compress and _precompressed_static suffix the ETag they send with
+    the encoding ("<tag>:br"), so either form of the tag counts as a match.
+    """
+    etag, _ = response.get_etag()
+    if etag and _client_has_etag(etag):
+        response.status_code = 304
+        response.set_data(b"")
+    return response
+
+
+def _client_has_etag(etag: str) -> bool:
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag or if_none_match.contains_weak(etag):
+        return True
+    # If-None-Match uses the weak comparison, so W/ tags count too.
+    return any(tag.startswith(f"{etag}:") for tag in if_none_match.as_set(include_weak=True))
+
+
+def init_compression(server) -> None:
+    """Register compression and caching for every response served by `server`."""
+    server.config.setdefault("COMPRESS_MIMETYPES", COMPRESSIBLE_MIMETYPES)
+    server.config.setdefault("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+    server.config.setdefault("COMPRESS_ALGORITHM", ["br", "gzip"] if brotli else ["gzip"])
+    # Brotli 4 / gzip 6 keep per-callback CPU low; static files get level 11/9 once.
+    server.config.setdefault("COMPRESS_BR_LEVEL", 4)
+    server.config.setdefault("COMPRESS_LEVEL", 6)
+    Compress(server)
+
+    # after_request hooks run in reverse registration order, so these run
+    # before Flask-Compress sees the response and it skips anything already encoded.
+    server.after_request(_precompressed_static)
+    server.after_request(_revalidate_layout)
@@ -0,0 +1,25 @@
+"""
+wsgi.py
+
+Production entry point. Importing `app` builds the Dash app, registers the
+pages and loads the master dataset, so a preloading server (gunicorn with
+preload_app, see gunicorn.conf.py) does all of that once before forking.
+
+Run locally:
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+Importing the app takes about 200 MB RSS on either data backend (Dash,
+plotly, pandas and the layout dominate), so the function in vercel.json is
+given 1024 MB.
+"""
+
+import plotly.express as px
+
+from app import server
+
+# Build one figure up front so plotly's lazily-loaded default template is
+# loaded in the master. Loading it concurrently from gthread workers races.
+px.line(title="warmup")
+
+# Vercel's Python runtime looks for a WSGI callable named `app`.
+app = application = server